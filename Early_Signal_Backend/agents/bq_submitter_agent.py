@@ -1,8 +1,9 @@
 # agents/bq_submitter_agent.py
-import json
+import orjson
+import time
+import uuid
 from typing import List, Dict, Tuple
-from google.cloud import bigquery
-from config import bq_client, TABLE_ID
+from config import bq_client, TABLE_ID, get_table
 
 import warnings
 warnings.filterwarnings(
@@ -18,15 +19,28 @@ You are {AGENT_NAME}, responsible for inserting de-identified public-health repo
 You will be handed a JSON report; your job is only to return a confirmation JSON.
 """
 
-def insert_into_bigquery(client: bigquery.Client, table_id: str, rows: List[Dict]):
-    table = client.get_table(table_id)
-    errors = client.insert_rows(table, rows)
-    if errors:
-        raise RuntimeError(f"BigQuery insert errors: {errors}")
+# A report gets one insert id, so retrying a failed request can't duplicate the row
+BQ_MAX_ATTEMPTS = 3
 
-def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
-    # 1) Parse the final report
-    report = json.loads(user_msg)
+
+def _insert_row(row: Dict):
+    row_id = uuid.uuid4().hex
+    for attempt in range(1, BQ_MAX_ATTEMPTS + 1):
+        try:
+            errors = bq_client.insert_rows(get_table(TABLE_ID), [row], row_ids=[row_id])
+        except Exception as e:
+            if attempt == BQ_MAX_ATTEMPTS:
+                raise
+            print(f"⚠️ BigQuery submission failed (attempt {attempt}/{BQ_MAX_ATTEMPTS}): {e}")
+            time.sleep(0.5 * 2 ** (attempt - 1))
+            continue
+        if errors:
+            raise RuntimeError(f"BigQuery insert errors: {errors}")
+        return
+
+def run_agent(user_msg: str, history: List[Dict]) -> Tuple[dict, List[Dict]]:
+    # 1) Parse the final report (the graph hands over the dict itself)
+    report = user_msg if isinstance(user_msg, dict) else orjson.loads(user_msg)
 
     # 2) Build a BigQuery row matching table schema
     row = {
@@ -73,9 +87,8 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
         row["current_geopoint"] = None
 
     # 4) Insert into BigQuery
-    client = bq_client or bigquery.Client()
     try:
-        insert_into_bigquery(client, TABLE_ID, [row])
+        _insert_row(row)
         status = {
             "status": "success",
             "rows_inserted": 1,
@@ -88,5 +101,5 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
             "console_output": f"❌ BigQuery submission failed: {str(e)}"
         }
 
-    # 5) Return a simple JSON confirmation
-    return json.dumps(status), history
\ No newline at end of file
+    # 5) Return a simple status dict
+    return status, history
\ No newline at end of file
@@ -1,6 +1,6 @@
 # agents/care_agent.py
-import json
-from helpers import generate, parse_json_from_response
+import orjson
+from helpers import cached_generate, parse_json_from_response
 
 AGENT_NAME = "care_agent"
 SYSTEM_PROMPT = """
@@ -16,24 +16,44 @@ Respond **ONLY** in JSON:
 }
 """
 
+# Only these report fields shape the advice. Sending just them (sorted) keeps per-report
+# noise like report_id, timestamps and coordinates out of the prompt, so identical
+# clinical pictures share one cached reply.
+_CARE_FIELDS = (
+    "final_diagnosis", "illness_category", "symptom_text",
+    "days_since_symptom_onset", "days_since_exposure",
+)
+
+
+def _care_prompt(report_json) -> str:
+    try:
+        report = report_json if isinstance(report_json, dict) else orjson.loads(report_json)
+    except (TypeError, ValueError):
+        return report_json
+    if not isinstance(report, dict):
+        return report_json
+    return orjson.dumps({k: report.get(k) for k in _CARE_FIELDS}, option=orjson.OPT_SORT_KEYS).decode()
+
+
 def run_agent(report_json: str, history: list):
-    # generate() actually returns (assistant_message, updated_history)
-    response_str, new_history = generate(
-        report_json,
+    # cached_generate() returns (assistant_message, updated_history), like generate()
+    response_str, new_history = cached_generate(
+        _care_prompt(report_json),
         history,
-        SYSTEM_PROMPT
+        SYSTEM_PROMPT,
+        branch="care"
     )
     # Try to ensure that if the LLM returns a string with code fencing/formatting, it's clean JSON
     try:
         response_json = parse_json_from_response(response_str)
         if isinstance(response_json, dict):
-            return json.dumps(response_json), new_history
+            return response_json, new_history
         else:
             # Try to parse as JSON
-            return json.dumps(json.loads(response_str)), new_history
+            return orjson.loads(response_str), new_history
     except Exception:
         # Fallback
-        return json.dumps({
+        return {
             "self_care_tips": [],
             "when_to_seek_help": "Sorry, could not generate advice."
-        }), new_history
+        }, new_history
@@ -1,6 +1,9 @@
 # agents/cluster_validation_agent.py
 
 import json
+import orjson
+import threading
+import time
 from typing import List, Dict, Tuple
 from datetime import datetime, timedelta
 from google.cloud import bigquery
@@ -12,6 +15,61 @@ AGENT_NAME = 'cluster_validation_agent'
 CLUSTERS_ALERT_VIEW = f"{PROJECT_ID}.alerts.test_clusters_alert_view"
 TRACTS_TABLE = f"{PROJECT_ID}.tracts.all_tracts"
 
+# In-memory snapshot of tracts that belong to any candidate cluster, so the
+# common "no outbreak nearby" case skips the per-request cluster query
+ACTIVE_TRACTS_TTL_SECONDS = 60
+# A failed load is remembered this long, so a BigQuery outage isn't re-queried on every request
+ACTIVE_TRACTS_FAILURE_SECONDS = 5
+_active_tracts = {"ts": 0.0, "blob": None, "failed_ts": None}
+_active_tracts_lock = threading.Lock()
+
+
+def get_active_cluster_tracts():
+    """
+    Return the distinct_tract_ids of every cluster that could match, joined
+    into one string (refreshed at most every ACTIVE_TRACTS_TTL_SECONDS).
+
+    Uses the same size/consensus/recency filters as query_matching_cluster,
+    minus the per-user temporal window, so it is a superset of what that
+    query can return. Returns None if the snapshot can't be loaded (or failed
+    within the last ACTIVE_TRACTS_FAILURE_SECONDS), in which case callers
+    should not filter.
+    """
+    now = time.monotonic()
+    if _active_tracts["blob"] is not None and now - _active_tracts["ts"] < ACTIVE_TRACTS_TTL_SECONDS:
+        return _active_tracts["blob"]
+    failed_ts = _active_tracts["failed_ts"]
+    if failed_ts is not None and now - failed_ts < ACTIVE_TRACTS_FAILURE_SECONDS:
+        return None
+    
+    with _active_tracts_lock:
+        now = time.monotonic()
+        if _active_tracts["blob"] is not None and now - _active_tracts["ts"] < ACTIVE_TRACTS_TTL_SECONDS:
+            return _active_tracts["blob"]
+        failed_ts = _active_tracts["failed_ts"]
+        if failed_ts is not None and now - failed_ts < ACTIVE_TRACTS_FAILURE_SECONDS:
+            return None
+        
+        query = f"""
+        SELECT distinct_tract_ids
+        FROM `{CLUSTERS_ALERT_VIEW}`
+        WHERE size_flag = TRUE
+          AND consensus_ratio >= 0.30
+          AND TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), last_report_ts, DAY) <= 30
+        """
+        try:
+            rows = bq_client.query(query).result()
+            blob = "|".join(row.distinct_tract_ids or "" for row in rows)
+        except Exception as e:
+            print(f"❔ Could not load active cluster tracts: {e}")
+            _active_tracts["failed_ts"] = time.monotonic()
+            return None
+        
+        _active_tracts["blob"] = blob
+        _active_tracts["ts"] = time.monotonic()
+        _active_tracts["failed_ts"] = None
+        return blob
+
 def geopoint_to_tract_id(latitude: float, longitude: float) -> str:
     """
     Convert a lat/lon coordinate to its census tract ID.
@@ -136,6 +194,12 @@ def query_matching_cluster(
     Returns:
         Dict with cluster data or empty dict if no match
     """
+    # Step 0: Nothing to match against - skip the tract lookups entirely
+    active_tracts = get_active_cluster_tracts()
+    if active_tracts == "":
+        print(f"   No active alert clusters - skipping cluster query")
+        return {}
+    
     # Step 1: Convert user's exposure location to tract_id
     user_tract_id = geopoint_to_tract_id(exposure_lat, exposure_lon)
     
@@ -162,6 +226,11 @@ def query_matching_cluster(
         else:
             print(f"   🗺️  Using {len(adjacent_tracts)} adjacent tracts for {illness_category} illness")
     
+    # Same CONTAINS_SUBSTR semantics as the query below, checked locally first
+    if active_tracts is not None and not any(t in active_tracts for t in adjacent_tracts):
+        print(f"   No active alert clusters in {len(adjacent_tracts)} tract(s)")
+        return {}
+    
     # Step 3: Calculate user's exposure date
     user_exposure_date = datetime.now() - timedelta(days=days_since_exposure)
     
@@ -611,7 +680,7 @@ Due to the diversity of diagnoses, we cannot confirm or refute your {validation_
 diagnosis based on cluster data. Your original diagnosis stands.
 """
 
-def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
+def run_agent(user_msg: str, history: List[Dict]) -> Tuple[dict, List[Dict]]:
     """
     Main entry point for cluster validation agent.
     
@@ -629,7 +698,7 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
         "current_longitude": -87.6500  # NEW: Optional
     }
     
-    Output format (JSON):
+    Output format (dict):
     {
         "cluster_found": true/false,
         "cluster_data": {...},
@@ -644,13 +713,13 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
     }
     """
     try:
-        data = json.loads(user_msg)
+        data = user_msg if isinstance(user_msg, dict) else orjson.loads(user_msg)
     except Exception as e:
-        return json.dumps({
+        return {
             "error": f"Invalid input JSON: {e}",
             "cluster_found": False,
             "validation_result": "ERROR"
-        }), history
+        }, history
     
     # Parse input
     user_disease = data.get("user_disease")
@@ -667,11 +736,11 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
     # Validate required fields
     if not all([user_disease, exposure_lat is not None, exposure_lon is not None, 
                 days_since_exposure is not None]):
-        return json.dumps({
+        return {
             "error": "Missing required fields: user_disease, exposure_latitude, exposure_longitude, days_since_exposure",
             "cluster_found": False,
             "validation_result": "ERROR"
-        }), history
+        }, history
     
     # NEW: Determine which coordinates to use based on illness category
     # For airborne/respiratory illnesses, use CURRENT location (where transmission happened)
@@ -746,4 +815,4 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
     
     print(f"📤 Full result object: {json.dumps(result, indent=2)}")
     
-    return json.dumps(result, indent=2), history
\ No newline at end of file
+    return result, history
\ No newline at end of file
@@ -1,12 +1,30 @@
 # agents/diagnostic_agent.py
 
-import json
+import orjson
 import re
-from typing import List, Dict, Tuple
+import sys
+from typing import List, Dict, Optional, Tuple
 from helpers import generate, strip_fences, fix_json
 
 AGENT_NAME = 'diagnostic_agent'
 
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Illness categories are a small fixed set compared and stored on every turn
+_CATEGORIES = frozenset(sys.intern(c) for c in (
+    "airborne", "foodborne", "waterborne", "insect-borne", "direct contact", "other"
+))
+
+# Constant responses; callers get a copy
+_ERR_NO_SYMPTOMS = {
+    "awaiting_field": "symptoms",
+    "console_output": "Please describe your symptoms."
+}
+_ERR_MISSING_SYMPTOM_INFO = {
+    "awaiting_field": "symptoms",
+    "console_output": "I need symptom information to proceed."
+}
+
 SYSTEM_PROMPT = f"""
 You are {AGENT_NAME}, a medical diagnostic expert for a public health tracking system. 
 
@@ -212,43 +230,157 @@ CRITICAL: When force_final_diagnosis is True, return ONLY JSON, nothing else!
 """
 
 
+_DIAGNOSIS_FIELD_RE = re.compile(
+    r'"(final_diagnosis|illness_category)"\s*:\s*"([^"]+)"|"(confidence)"\s*:\s*([\d.]+)'
+)
+
+
+def _scan_diagnosis(text: str) -> Optional[dict]:
+    """Single pass over text: try each top-level {...} block, return the first with a diagnosis."""
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            if depth:
+                in_string = True
+        elif ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                try:
+                    candidate = orjson.loads(text[start:i + 1])
+                except ValueError:
+                    continue
+                if isinstance(candidate, dict) and "final_diagnosis" in candidate:
+                    return candidate
+    return None
+
+
 def extract_diagnosis_from_mixed_response(text: str) -> dict:
     """Try to extract diagnosis JSON from text that may contain other content."""
-    # Look for JSON object in the text
-    json_match = re.search(r'\{[^{}]*"final_diagnosis"[^{}]*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except:
-            pass
+    parsed = _scan_diagnosis(text)
+    if parsed:
+        return parsed
     
-    # Try to extract key fields manually
-    diag_match = re.search(r'"final_diagnosis"\s*:\s*"([^"]+)"', text)
-    cat_match = re.search(r'"illness_category"\s*:\s*"([^"]+)"', text)
-    conf_match = re.search(r'"confidence"\s*:\s*([\d.]+)', text)
+    # Try to extract key fields manually (one regex pass, first hit per field wins)
+    fields = {}
+    for match in _DIAGNOSIS_FIELD_RE.finditer(text):
+        key = match.group(1) or match.group(3)
+        if key not in fields:
+            fields[key] = match.group(2) if match.group(1) else match.group(4)
     
-    if diag_match and cat_match:
+    if "final_diagnosis" in fields and "illness_category" in fields:
+        try:
+            confidence = float(fields["confidence"]) if "confidence" in fields else 0.5
+        except ValueError:
+            confidence = 0.5
         return {
-            "final_diagnosis": diag_match.group(1),
-            "illness_category": cat_match.group(1),
-            "confidence": float(conf_match.group(1)) if conf_match else 0.5,
+            "final_diagnosis": fields["final_diagnosis"],
+            "illness_category": fields["illness_category"],
+            "confidence": confidence,
             "reasoning": "Extracted from partial response"
         }
     
     return None
 
-def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
+# Fallback diagnoses are fixed payloads; callers get a copy
+_FALLBACK_FOOD_POISONING = {
+    "final_diagnosis": "Food poisoning",
+    "illness_category": "foodborne",
+    "confidence": 0.65,
+    "reasoning": "Patient presents with gastrointestinal symptoms consistent with foodborne illness."
+}
+_FALLBACK_GASTROENTERITIS = {
+    "final_diagnosis": "Gastroenteritis",
+    "illness_category": "foodborne",
+    "confidence": 0.65,
+    "reasoning": "Patient presents with gastrointestinal symptoms consistent with foodborne illness."
+}
+_FALLBACK_RESPIRATORY = {
+    "final_diagnosis": "Upper Respiratory Infection",
+    "illness_category": "airborne",
+    "confidence": 0.6,
+    "reasoning": "Patient presents with respiratory symptoms."
+}
+_FALLBACK_VIRAL = {
+    "final_diagnosis": "Viral Infection",
+    "illness_category": "other",
+    "confidence": 0.4,
+    "reasoning": "Based on available symptom information. Recommend professional medical evaluation."
+}
+_MAX_CLARIFY_GASTROENTERITIS = {
+    "final_diagnosis": "Gastroenteritis",
+    "illness_category": "foodborne",
+    "confidence": 0.6,
+    "reasoning": "Based on gastrointestinal symptoms presented."
+}
+_MAX_CLARIFY_VIRAL = {
+    "final_diagnosis": "Viral Infection",
+    "illness_category": "other",
+    "confidence": 0.5,
+    "reasoning": "Based on available information. Medical consultation recommended."
+}
+
+_GI_KEYWORDS = ('nausea', 'vomit', 'diarrhea', 'stomach', 'cramp')
+_RESPIRATORY_KEYWORDS = ('cough', 'sneeze', 'throat', 'congestion')
+
+
+def _has_keyword(text: str, keywords) -> bool:
+    return any(k in text for k in keywords)
+
+
+def _fallback_diagnosis(symptoms: list, clarifier_context: list) -> dict:
+    """Rule-based diagnosis used when a forced final diagnosis could not be parsed."""
+    symptom_text = ' '.join(symptoms).lower()
+    has_gi = _has_keyword(symptom_text, _GI_KEYWORDS)
+    
+    # Tokenize the answers once, then test membership instead of re-scanning a joined string
+    answer_tokens = set()
+    for qa in clarifier_context:
+        answer_tokens.update(_WORD_RE.findall(qa.get('answer', '').lower()))
+    
+    has_nausea_confirmed = 'nausea' in answer_tokens or 'yes' in answer_tokens
+    has_vomit_confirmed = any(t.startswith('vomit') for t in answer_tokens)
+    has_diarrhea_confirmed = 'diarrhea' in answer_tokens
+    
+    if has_gi or has_nausea_confirmed or has_vomit_confirmed or has_diarrhea_confirmed:
+        fever_asked = any('fever' in _WORD_RE.findall(qa.get('question', '').lower()) for qa in clarifier_context)
+        no_fever_confirmed = 'no' in answer_tokens and fever_asked
+        return dict(_FALLBACK_GASTROENTERITIS if no_fever_confirmed else _FALLBACK_FOOD_POISONING)
+    if _has_keyword(symptom_text, _RESPIRATORY_KEYWORDS):
+        return dict(_FALLBACK_RESPIRATORY)
+    return dict(_FALLBACK_VIRAL)
+
+
+def _max_clarification_fallback(symptoms: list) -> dict:
+    """Rule-based diagnosis once the clarification budget is used up."""
+    if _has_keyword(' '.join(symptoms).lower(), _GI_KEYWORDS):
+        return dict(_MAX_CLARIFY_GASTROENTERITIS)
+    return dict(_MAX_CLARIFY_VIRAL)
+
+
+def run_agent(user_msg: str, history: List[Dict]) -> Tuple[dict, List[Dict]]:
     """
     Run the diagnostic agent to either ask clarifying questions or provide a diagnosis.
+    Returns the result dict (diagnosis or clarifier question) and the updated history.
     """
     # Parse user_msg
     try:
-        data = json.loads(user_msg)
+        data = user_msg if isinstance(user_msg, dict) else orjson.loads(user_msg)
     except Exception:
-        return json.dumps({
-            "awaiting_field": "symptoms",
-            "console_output": "Please describe your symptoms."
-        }), history
+        return dict(_ERR_NO_SYMPTOMS), history
 
     # Unpack context
     symptoms = data.get("symptoms", [])
@@ -258,10 +390,7 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
 
     # Validate we have minimum required data
     if not symptoms or days_since_onset is None:
-        return json.dumps({
-            "awaiting_field": "symptoms",
-            "console_output": "I need symptom information to proceed."
-        }), history
+        return dict(_ERR_MISSING_SYMPTOM_INFO), history
 
     # Build payload for LLM
     payload = {
@@ -277,99 +406,47 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
 
     
     # Run LLM
-    raw, history = generate(json.dumps(payload), history, SYSTEM_PROMPT)
+    raw, history = generate(orjson.dumps(payload).decode(), history, SYSTEM_PROMPT)
     text = strip_fences(raw).strip()
     
     # Try to parse as diagnosis JSON
     try:
         # Try direct parse first
-        parsed = json.loads(text)
+        parsed = orjson.loads(text)
         
         if "final_diagnosis" in parsed and "illness_category" in parsed:
+            if isinstance(parsed["illness_category"], str):
+                parsed["illness_category"] = sys.intern(parsed["illness_category"])
+            if parsed["illness_category"] not in _CATEGORIES:
+                print(f"⚠️ Unexpected illness_category from LLM: {parsed['illness_category']}")
             if "confidence" not in parsed:
                 parsed["confidence"] = 0.5
             if "reasoning" not in parsed:
                 parsed["reasoning"] = "Diagnosis based on presented symptoms."
             
-            return json.dumps(parsed), history
+            return parsed, history
             
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         # Try to extract JSON from mixed content
         if force_final:
             extracted = extract_diagnosis_from_mixed_response(text)
             if extracted:
-                return json.dumps(extracted), history
+                return extracted, history
     
     # If force_final and still no diagnosis, make an intelligent fallback
     if force_final:
-        
-        # Analyze symptoms to make best guess
-        symptoms_lower = [s.lower() for s in symptoms]
-        has_gi = any(x in ' '.join(symptoms_lower) for x in ['nausea', 'vomit', 'diarrhea', 'stomach', 'cramp'])
-        has_respiratory = any(x in ' '.join(symptoms_lower) for x in ['cough', 'sneeze', 'throat', 'congestion'])
-        has_fever_mentioned = any('fever' in s for s in symptoms_lower)
-        
-        # Check clarifier context for additional info
-        answers_lower = ' '.join([qa.get('answer', '').lower() for qa in clarifier_context])
-        has_nausea_confirmed = 'nausea' in answers_lower or 'yes' in answers_lower
-        has_vomit_confirmed = 'vomit' in answers_lower
-        has_diarrhea_confirmed = 'diarrhea' in answers_lower or 'yes' in answers_lower
-        no_fever_confirmed = 'no' in answers_lower and any('fever' in qa.get('question', '').lower() for qa in clarifier_context)
-        
-        if has_gi or has_nausea_confirmed or has_vomit_confirmed or has_diarrhea_confirmed:
-            fallback_diagnosis = {
-                "final_diagnosis": "Gastroenteritis" if no_fever_confirmed else "Food poisoning",
-                "illness_category": "foodborne",
-                "confidence": 0.65,
-                "reasoning": "Patient presents with gastrointestinal symptoms consistent with foodborne illness."
-            }
-        elif has_respiratory:
-            fallback_diagnosis = {
-                "final_diagnosis": "Upper Respiratory Infection",
-                "illness_category": "airborne",
-                "confidence": 0.6,
-                "reasoning": "Patient presents with respiratory symptoms."
-            }
-        else:
-            fallback_diagnosis = {
-                "final_diagnosis": "Viral Infection",
-                "illness_category": "other",
-                "confidence": 0.4,
-                "reasoning": "Based on available symptom information. Recommend professional medical evaluation."
-            }
-        
-        return json.dumps(fallback_diagnosis), history
+        return _fallback_diagnosis(symptoms, clarifier_context), history
     
     # Check if we've hit max clarifications
     if len(clarifier_context) >= 3:
-        # Same intelligent fallback as above
-        # (copy the same logic as in the force_final block above)
-        symptoms_lower = [s.lower() for s in symptoms]
-        has_gi = any(x in ' '.join(symptoms_lower) for x in ['nausea', 'vomit', 'diarrhea', 'stomach', 'cramp'])
-        
-        if has_gi:
-            fallback_diagnosis = {
-                "final_diagnosis": "Gastroenteritis",
-                "illness_category": "foodborne",
-                "confidence": 0.6,
-                "reasoning": "Based on gastrointestinal symptoms presented."
-            }
-        else:
-            fallback_diagnosis = {
-                "final_diagnosis": "Viral Infection",
-                "illness_category": "other",
-                "confidence": 0.5,
-                "reasoning": "Based on available information. Medical consultation recommended."
-            }
-        
-        return json.dumps(fallback_diagnosis), history
+        return _max_clarification_fallback(symptoms), history
     
     # It's a clarifier question
-    return json.dumps({
+    return {
         "awaiting_field": "clarifier_answer",
         "console_output": text,
         "symptoms": symptoms,
         "days_since_onset": days_since_onset,
         "clarifier_context": clarifier_context,
         "last_clarifier_question": text
-    }), history
\ No newline at end of file
+    }, history
\ No newline at end of file
@@ -1,17 +1,22 @@
 # agents/exposure_agent.py - Version 7.5 (Cleaned)
 
-import json
+import re
+import sys
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
 try:
-    from helpers import geocode_location, parse_json_from_response, generate
+    from helpers import geocode_location, parse_json_from_response, cached_generate, extract_days_directly
 except ImportError:
     def geocode_location(location, bias_lat=None, bias_lon=None):
         return None, None
     def parse_json_from_response(text):
         return {}
-    def generate(prompt, history, system_prompt):
+    def cached_generate(prompt, history, system_prompt, branch=""):
         return "{}", history
+    def extract_days_directly(text):
+        return None
 
 
 AGENT_NAME = "exposure_agent"
@@ -59,120 +64,244 @@ If unable to extract anything meaningful:
 - Don't ask for more specificity - the geocoding system will handle vague names
 """
 
+# Per-branch extraction prompts; only the small dynamic bits are filled in per turn
+_DAYS_PROMPT_TMPL = """The patient was at "{loc}". 
+They just said: "{ui}"
+
+Extract ONLY the number of days from their response. Look for:
+- Pure numbers: "5" → {{"days_since_exposure": 5}}
+- Time phrases: "3 days ago" → {{"days_since_exposure": 3}}
+- Temporal words: "yesterday" → {{"days_since_exposure": 1}}
+
+CRITICAL: We already have location="{loc}", ONLY extract days as integer."""
+
+_LOCATION_PROMPT_TMPL = """The exposure was {days} days ago.
+They just said: "{ui}"
+
+Extract ONLY the location/venue name from their response.
+Strip filler words like "at", "I was at", etc.
+
+Examples:
+- "Chipotle" → {{"exposure_location_name": "Chipotle"}}
+- "mc donalds" → {{"exposure_location_name": "mc donalds"}}
+- "the park" → {{"exposure_location_name": "the park"}}
+
+CRITICAL: We already have days={days}, ONLY extract location."""
+
+_BOTH_PROMPT_TMPL = """Patient has {diagnosis} ({category}).
+They said: "{ui}"
+
+Extract the exposure location AND/OR days ago from their statement.
+Be LENIENT - extract ANY location or timing you can find.
+
+Examples:
+- "Chipotle 3 days ago" → {{"exposure_location_name": "Chipotle", "days_since_exposure": 3}}
+- "Chipotle on Michigan Avenue" → {{"exposure_location_name": "Chipotle, Michigan Avenue"}}
+- "3 days ago" → {{"days_since_exposure": 3}}
+
+Return whatever you can extract."""
+
+# Constant responses, built once at import (callers get a shallow copy)
+_ERR_INVALID_ANSWER = {
+    "awaiting_field": "exposure_info",
+    "console_output": "Please provide the specific place where you think you were exposed and how many days ago. This information is important for public health tracking."
+}
+_ERR_NOT_UNDERSTOOD = {
+    "awaiting_field": "exposure_info",
+    "console_output": "Sorry, I didn't understand that. Where and when were you exposed? Please provide the location and how many days ago."
+}
+_ERR_NEED_BOTH = {
+    "awaiting_field": "exposure_info",
+    "console_output": "Please provide both the location (venue/city) and when (how many days ago) you were exposed."
+}
+
+_INITIAL_QUESTIONS = {
+    "foodborne": "Where did you eat recently that might have caused your symptoms? Please include the restaurant/venue name, city/area and how many days ago.",
+    "waterborne": "Where were you exposed to water that might have caused your symptoms? (e.g., swimming pool, lake, beach) Please include when this was.",
+    "airborne": "Where do you think you were exposed to someone who was sick? Please provide the location (venue, city/area) and how many days ago.",
+    "insect-borne": "Where were you when you might have been bitten or stung? Please provide the location (venue, city/area) and how many days ago.",
+}
+# Default for unknown categories
+_DEFAULT_INITIAL_QUESTION = "Where and when do you think you were exposed? Please provide the location (venue, city/area) and how many days ago."
+
+
+_INVALID_RESPONSES = frozenset(sys.intern(r) for r in (
+    "i don't know", "dont know", "don't know", "unknown",
+    "not sure", "idk", "no idea", "nowhere", "n/a", "na"
+))
+
 
 def is_invalid_answer(text):
     """Check if answer is a non-answer."""
-    if not text:
-        return True
-    text_lower = text.lower().strip()
-    invalid_responses = [
-        "i don't know", "dont know", "don't know", "unknown", 
-        "not sure", "idk", "no idea", "nowhere", "n/a", "na"
-    ]
-    return text_lower in invalid_responses
+    return not text or text.lower().strip() in _INVALID_RESPONSES
+
+
+# Geocoding is a blocking HTTP round-trip; a small pool lets it overlap with the LLM call
+_GEOCODE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="exposure-geocode")
+
+
+_FILLER_RE = re.compile(r'^(i\s+(was\s+)?(ate\s+)?at\s+|i\s+went\s+to\s+|at\s+|the\s+)', re.I)
+_GENERIC_VENUES = frozenset({
+    "school", "work", "office", "restaurant", "store", "home", "party", "gym", "park", "outside"
+})
+# Words that mean the reply is an answer/hedge/time rather than a place name
+_NON_VENUE_WORDS = frozenset({
+    "yes", "no", "maybe", "not", "think", "probably", "somewhere", "don't", "dont", "ago", "when",
+    "i", "know", "remember", "recall", "forgot", "forget", "sure", "idea", "can't", "cant", "unsure",
+    "knows", "clue", "dunno", "idk",
+    # negations
+    "nope", "none", "nothing", "nah", "never", "nowhere", "neither",
+    # filler / conversational
+    "hmm", "hm", "um", "uh", "ok", "okay", "thanks", "thank", "wait", "what", "pass", "same",
+    "before", "usual", "everywhere", "anywhere", "around", "town", "here", "there", "earlier", "later",
+    # weekdays and times of day
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "weekend",
+    "today", "yesterday", "tonight", "morning", "afternoon", "evening", "night", "last", "this", "week",
+})
+# Place-type words that mark a reply as a venue ("the pool", "taco truck")
+_VENUE_KEYWORDS = frozenset({
+    "restaurant", "cafe", "café", "bar", "grill", "diner", "pizza", "pizzeria", "bakery", "buffet",
+    "kitchen", "bistro", "truck", "market", "mall", "hotel", "pool", "lake", "beach", "river",
+    "park", "gym", "school", "hospital", "church", "stadium", "festival", "club", "camp"
+})
+
+
+def venue_from_reply(text):
+    """
+    Return the venue if the reply is just a place name (e.g. "the pool", "Whole Foods Market"),
+    otherwise None so the caller falls back to the LLM.
+    """
+    venue = _FILLER_RE.sub('', text.strip()).strip(" .!")
+    if not 2 <= len(venue) <= 80 or not 1 <= len(venue.split()) <= 6:
+        return None
+    if "?" in venue or _FILLER_RE.match(venue):
+        return None
+    if is_invalid_answer(venue) or venue.lower() in _GENERIC_VENUES:
+        return None
+    words = [w.strip(".,!'\"").replace("\u2019", "'") for w in venue.split()]
+    if any(w.lower() in _NON_VENUE_WORDS for w in words):
+        return None
+    # Timing mixed in ("Chipotle 3 days ago") needs real extraction
+    if extract_days_directly(venue) is not None or any(ch.isdigit() for ch in venue):
+        return None
+    # Only take it without the LLM when it clearly names a place: a place-type word, or at
+    # least two capitalised words after the first (keyboards capitalise the first on their own)
+    if not any(w.lower() in _VENUE_KEYWORDS for w in words) and sum(w[:1].isupper() for w in words[1:]) < 2:
+        return None
+    return venue
+
+
+def _geocode_exposure(location_name, state=None):
+    """Geocode the exposure location, biased to the user's GPS if known."""
+    user_lat = None
+    user_lon = None
+    if state:
+        location_json = state.get("location_json") or {}
+        user_lat = location_json.get("current_latitude")
+        user_lon = location_json.get("current_longitude")
+    
+    try:
+        return geocode_location(location_name, bias_lat=user_lat, bias_lon=user_lon)
+    except Exception as e:
+        print(f"❌ Geocoding error: {e}")
+        return None, None
 
 
-def run_agent(user_msg: str, history: list, state: dict = None) -> Tuple[str, list]:
+def _complete_exposure(location_name, days, state=None, geocode_future=None) -> dict:
+    """Build the final exposure result, reusing an in-flight geocode for the same location if given."""
+    if geocode_future is not None:
+        lat, lon = geocode_future.result()
+    else:
+        lat, lon = _geocode_exposure(location_name, state)
+    
+    result = {
+        "exposure_location_name": location_name,
+        "exposure_latitude": lat,
+        "exposure_longitude": lon,
+        "days_since_exposure": days,
+        "console_output": f"Recorded exposure at {location_name} ({days} days ago)"
+    }
+    return result
+
+
+def run_agent(user_msg: str, history: list, state: dict = None) -> Tuple[dict, list]:
     """
     LLM-based exposure agent compatible with graph orchestrator.
     Uses generate() for flexible natural language understanding.
     
     Args:
-        user_msg: User input or JSON payload
+        user_msg: User input, or the payload as a dict or JSON string
         history: Conversation history
         state: Graph state (optional, for GPS access)
     """
     # Parse the incoming message
     payload = {}
-    try:
-        if isinstance(user_msg, str) and user_msg.strip():
-            if user_msg.strip().startswith('{'):
-                payload = json.loads(user_msg)
-            else:
-                payload = {"user_input": user_msg}
-    except json.JSONDecodeError:
-        payload = {}
-    except Exception:
-        payload = {}
+    if isinstance(user_msg, dict):
+        payload = user_msg
+    elif isinstance(user_msg, str) and user_msg.strip():
+        if user_msg.lstrip().startswith('{'):
+            try:
+                payload = orjson.loads(user_msg)
+            except orjson.JSONDecodeError:
+                payload = {}
+        else:
+            payload = {"user_input": user_msg}
     
     # Get context from payload
     user_input = payload.get("user_input", "").strip()
     partial_location = payload.get("partial_location")
     partial_days = payload.get("partial_days")
-    illness_category = payload.get("illness_category", "").lower()
+    illness_category = sys.intern((payload.get("illness_category") or "").lower())
     diagnosis = payload.get("diagnosis", "your condition")
     
+    geocode_future = None
+    
     # Build the prompt for the LLM based on context
     if user_input:
         # User has provided input - we're in follow-up mode
         
         if is_invalid_answer(user_input):
-            return json.dumps({
-                "awaiting_field": "exposure_info",
-                "console_output": "Please provide the specific place where you think you were exposed and how many days ago. This information is important for public health tracking."
-            }), history
+            return dict(_ERR_INVALID_ANSWER), history
         
         # Build context-aware prompt with explicit instructions
         if partial_location and partial_days is None:
-            # We have location, asking for days
-            prompt = f"""The patient was at "{partial_location}". 
-They just said: "{user_input}"
-
-Extract ONLY the number of days from their response. Look for:
-- Pure numbers: "5" → {{"days_since_exposure": 5}}
-- Time phrases: "3 days ago" → {{"days_since_exposure": 3}}
-- Temporal words: "yesterday" → {{"days_since_exposure": 1}}
-
-CRITICAL: We already have location="{partial_location}", ONLY extract days as integer."""
+            # We have location, asking for days - try the cheap parse before the LLM
+            branch = "days"
+            days = extract_days_directly(user_input)
+            if days is not None:
+                return _complete_exposure(partial_location, days, state), history
+            
+            # Location is already known, so start geocoding it while the LLM extracts the days
+            geocode_future = _GEOCODE_POOL.submit(_geocode_exposure, partial_location, state)
+            
+            prompt = _DAYS_PROMPT_TMPL.format(loc=partial_location, ui=user_input)
 
         elif partial_days is not None and not partial_location:
-            # We have days, asking for location
-            prompt = f"""The exposure was {partial_days} days ago.
-They just said: "{user_input}"
-
-Extract ONLY the location/venue name from their response.
-Strip filler words like "at", "I was at", etc.
-
-Examples:
-- "Chipotle" → {{"exposure_location_name": "Chipotle"}}
-- "mc donalds" → {{"exposure_location_name": "mc donalds"}}
-- "the park" → {{"exposure_location_name": "the park"}}
-
-CRITICAL: We already have days={partial_days}, ONLY extract location."""
+            # We have days, asking for location - a bare venue name needs no LLM extraction
+            branch = "location"
+            venue = venue_from_reply(user_input)
+            if venue:
+                return _complete_exposure(venue, partial_days, state), history
+            
+            prompt = _LOCATION_PROMPT_TMPL.format(days=partial_days, ui=user_input)
 
         else:
             # Initial response - extract both
-            prompt = f"""Patient has {diagnosis} ({illness_category}).
-They said: "{user_input}"
-
-Extract the exposure location AND/OR days ago from their statement.
-Be LENIENT - extract ANY location or timing you can find.
-
-Examples:
-- "Chipotle 3 days ago" → {{"exposure_location_name": "Chipotle", "days_since_exposure": 3}}
-- "Chipotle on Michigan Avenue" → {{"exposure_location_name": "Chipotle, Michigan Avenue"}}
-- "3 days ago" → {{"days_since_exposure": 3}}
-
-Return whatever you can extract."""
+            branch = "both"
+            prompt = _BOTH_PROMPT_TMPL.format(diagnosis=diagnosis, category=illness_category, ui=user_input)
         
         # Call LLM
-        response_text, updated_history = generate(prompt, history, SYSTEM_PROMPT)
+        response_text, updated_history = cached_generate(prompt, history, SYSTEM_PROMPT, branch=branch)
         
         data = parse_json_from_response(response_text)
         
         if not isinstance(data, dict):
             # LLM didn't return valid JSON
-            return json.dumps({
-                "awaiting_field": "exposure_info",
-                "console_output": "Sorry, I didn't understand that. Where and when were you exposed? Please provide the location and how many days ago."
-            }), updated_history
+            return dict(_ERR_NOT_UNDERSTOOD), updated_history
         
         # CRITICAL: Check if LLM couldn't extract anything
         if data.get("needs_clarification"):
-            return json.dumps({
-                "awaiting_field": "exposure_info",
-                "console_output": "Please provide both the location (venue/city) and when (how many days ago) you were exposed."
-            }), updated_history
+            return dict(_ERR_NEED_BOTH), updated_history
         
         # Merge with partial data BEFORE checking completeness
         if partial_location and not data.get("exposure_location_name"):
@@ -192,29 +321,8 @@ Return whatever you can extract."""
         if has_location and has_days:
             # Complete! Geocode and return
             location_name = data["exposure_location_name"]
-            days = data["days_since_exposure"]
-            
-            # Get GPS for bias (from state if available)
-            user_lat = None
-            user_lon = None
-            if state:
-                user_lat = state.get("location_json", {}).get("current_latitude")
-                user_lon = state.get("location_json", {}).get("current_longitude")
-            
-            try:
-                lat, lon = geocode_location(location_name, bias_lat=user_lat, bias_lon=user_lon)
-            except Exception as e:
-                print(f"❌ Geocoding error: {e}")
-                lat, lon = None, None
-            
-            result = {
-                "exposure_location_name": location_name,
-                "exposure_latitude": lat,
-                "exposure_longitude": lon,
-                "days_since_exposure": days,
-                "console_output": f"Recorded exposure at {location_name} ({days} days ago)"
-            }
-            return json.dumps(result), updated_history
+            reuse = geocode_future if location_name == partial_location else None
+            return _complete_exposure(location_name, data["days_since_exposure"], state, reuse), updated_history
         
         # Partial data - ask for what's missing
         if has_location and not has_days:
@@ -223,7 +331,7 @@ Return whatever you can extract."""
                 "console_output": f"How many days ago were you at {data['exposure_location_name']}?",
                 "partial_location": data["exposure_location_name"]
             }
-            return json.dumps(result), updated_history
+            return result, updated_history
         
         if not has_location and has_days:
             result = {
@@ -231,31 +339,16 @@ Return whatever you can extract."""
                 "console_output": "Where specifically were you exposed? Please provide the venue name or location.",
                 "partial_days": data["days_since_exposure"]
             }
-            return json.dumps(result), updated_history
+            return result, updated_history
         
         # Neither extracted successfully
-        return json.dumps({
-            "awaiting_field": "exposure_info",
-            "console_output": "Please provide both the location (venue/city) and when (how many days ago) you were exposed."
-        }), updated_history
+        return dict(_ERR_NEED_BOTH), updated_history
     
     else:
         # No user input - this is the FIRST call from diagnosis node
         
-        # Generate category-specific initial question
-        if illness_category == "foodborne":
-            initial_question = "Where did you eat recently that might have caused your symptoms? Please include the restaurant/venue name, city/area and how many days ago."
-        elif illness_category == "waterborne":
-            initial_question = "Where were you exposed to water that might have caused your symptoms? (e.g., swimming pool, lake, beach) Please include when this was."
-        elif illness_category == "airborne":
-            initial_question = "Where do you think you were exposed to someone who was sick? Please provide the location (venue, city/area) and how many days ago."
-        elif illness_category == "insect-borne":
-            initial_question = "Where were you when you might have been bitten or stung? Please provide the location (venue, city/area) and how many days ago."
-        else:
-            # Default for unknown categories
-            initial_question = "Where and when do you think you were exposed? Please provide the location (venue, city/area) and how many days ago."
-        
-        return json.dumps({
+        # Category-specific initial question
+        return {
             "awaiting_field": "exposure_info",
-            "console_output": initial_question
-        }), history
\ No newline at end of file
+            "console_output": _INITIAL_QUESTIONS.get(illness_category, _DEFAULT_INITIAL_QUESTION)
+        }, history
\ No newline at end of file
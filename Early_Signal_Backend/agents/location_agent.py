@@ -1,5 +1,5 @@
 # agents/location_agent.py
-import json
+import orjson
 from typing import List, Dict, Tuple
 from helpers import generate, geocode_location, parse_json_from_response
 
@@ -37,37 +37,40 @@ Return ONLY this raw JSON (no formatting, no extra text):
 }} 
 """
 
-def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
+def run_agent(user_msg: str, history: List[Dict]) -> Tuple[dict, List[Dict]]:
     try:
-        data = json.loads(user_msg) if isinstance(user_msg, str) and user_msg.strip().startswith('{') else None
+        if isinstance(user_msg, dict):
+            data = user_msg
+        else:
+            data = orjson.loads(user_msg) if isinstance(user_msg, str) and user_msg.strip().startswith('{') else None
     except Exception:
         data = None
 
     # Check if location was already provided via GPS
     if data and data.get("skip_location_questions"):
         # Location already set in orchestrator, just return it
-        return json.dumps({
+        return {
             "current_location_name": data.get("current_location_name"),
             "current_latitude": data.get("current_latitude"),
             "current_longitude": data.get("current_longitude"),
             "location_category": data.get("location_category") or "urban"
-        }), history
+        }, history
     
     # Ask for location if not provided
     if not user_msg or (data and data.get("awaiting_field") == "city_state"):
-        return json.dumps({
+        return {
             "awaiting_field": "city_state",
             "console_output": "To help me understand your current situation, could you tell me what city and state you're in right now?"
-        }), history
+        }, history
 
     if data and data.get("awaiting_field") == "venue":
         city_state = data.get("city_state", "")
         venue_response = data.get("user_input", "")
         if not venue_response:
-            return json.dumps({
+            return {
                 "awaiting_field": "venue",
                 "console_output": f"Could you specify a venue name, landmark, neighborhood, cross-street, or address in {city_state}?"
-            }), history
+            }, history
         full_location = f"{venue_response}, {city_state}" if city_state else venue_response
         response_text, history = generate(full_location, history, SYSTEM_PROMPT)
         location_data = parse_json_from_response(response_text)
@@ -84,25 +87,25 @@ def run_agent(user_msg: str, history: List[Dict]) -> Tuple[str, List[Dict]]:
             location_data["current_location_name"] = full_location
             location_data["current_latitude"] = lat
             location_data["current_longitude"] = lon
-            return json.dumps(location_data), history
+            return location_data, history
         else:
             # Fallback: just use what we have, don't keep re-prompting
-            return json.dumps({
+            return {
                 "current_location_name": full_location,
                 "current_latitude": None,
                 "current_longitude": None,
                 "location_category": None
-            }), history
+            }, history
 
     city_response = user_msg.strip()
     if not city_response:
-        return json.dumps({
+        return {
             "awaiting_field": "city_state",
             "console_output": "To help me understand your current situation, could you tell me what city and state you're in right now?"
-        }), history
+        }, history
 
-    return json.dumps({
+    return {
         "awaiting_field": "venue",
         "console_output": f"Could you specify a venue name, landmark, neighborhood, cross-street, or address in {city_response}?",
         "city_state": city_response
-    }), history
\ No newline at end of file
+    }, history
\ No newline at end of file
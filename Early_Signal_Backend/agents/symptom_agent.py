@@ -1,7 +1,7 @@
 # agents/symptom_agent.py
-import json
 import re
-from helpers import strip_fences, generate, fix_json
+import orjson
+from helpers import strip_fences, cached_generate, fix_json, extract_days_directly
 
 AGENT_NAME = "symptom_agent"
 SYSTEM_PROMPT = f"""
@@ -26,47 +26,20 @@ Examples:
 - "fever started 2 days ago" → {{"symptoms": ["fever"], "days_since_onset": 2}}
 """
 
+_TEMPORAL_PATTERNS = [re.compile(p) for p in (
+    r'^\d+$',  # Just a number
+    r'^\d+\s*(day|days|week|weeks)(\s+ago)?$',  # "3 days ago"
+    r'^(yesterday|today|last week)$',
+    r'^(ago|day|days)$'
+)]
+
+
 def is_temporal_phrase(text):
     """Check if text is purely temporal (not a symptom)"""
     text_lower = text.strip().lower()
-    temporal_patterns = [
-        r'^\d+$',  # Just a number
-        r'^\d+\s*(day|days|week|weeks)(\s+ago)?$',  # "3 days ago"
-        r'^(yesterday|today|last week)$',
-        r'^(ago|day|days)$'
-    ]
-    return any(re.match(pattern, text_lower) for pattern in temporal_patterns)
-
-
-def extract_days_directly(text: str) -> int:
-    """
-    Directly parse timing from user input without LLM.
-    Returns number of days or None if not found.
-    """
-    text_lower = text.strip().lower()
-    
-    # Match pure number (most common case when we ask "how many days ago?")
-    if re.match(r'^\d+$', text_lower):
-        return int(text_lower)
-    
-    # Match "X days" or "X days ago"
-    match = re.search(r'(\d+)\s*days?\s*(ago)?', text_lower)
-    if match:
-        return int(match.group(1))
-    
-    # Match "yesterday"
-    if 'yesterday' in text_lower:
-        return 1
-    
-    # Match "today"
-    if 'today' in text_lower:
-        return 0
-    
-    # Match "last week" or "a week ago"
-    if 'last week' in text_lower or 'a week ago' in text_lower:
-        return 7
-    
-    return None
+    if text_lower.isdigit():
+        return True
+    return any(p.match(text_lower) for p in _TEMPORAL_PATTERNS)
 
 
 def run_agent(user_msg: str, history: list, current_state: dict = None):
@@ -74,40 +47,37 @@ def run_agent(user_msg: str, history: list, current_state: dict = None):
     
     # Parse if it's a JSON payload with state
     if current_state is None:
-        try:
-            if user_msg.strip().startswith('{'):
-                payload = json.loads(user_msg)
+        if user_msg.lstrip().startswith('{'):
+            try:
+                payload = orjson.loads(user_msg)
                 current_state = payload
                 user_msg = payload.get("user_input", user_msg)
-        except:
-            current_state = {}
+            except orjson.JSONDecodeError:
+                current_state = {}
     
     current_symptoms = current_state.get("current_symptoms", []) if current_state else []
-    current_days = current_state.get("current_days")
+    current_days = current_state.get("current_days") if current_state else None
     
     # DIRECT PARSING: If we have symptoms and are waiting for days, parse directly
     if current_symptoms and current_days is None:
         days = extract_days_directly(user_msg)
         if days is not None:
             # Success! Return complete data without LLM call
-            return json.dumps({
+            return {
                 "symptoms": current_symptoms,
                 "days_since_onset": days
-            }), history
+            }, history
         # If direct parse failed, user might have given more symptoms or unclear input
         # Fall through to LLM
     
-    # DIRECT PARSING: If we have days and are waiting for symptoms
-    # Just use LLM for symptom extraction, preserve days
-    if current_days is not None and not current_symptoms:
-        # Use LLM only for symptoms, we already have timing
-        pass  # Fall through to LLM
-    
     # Build context-aware prompt for LLM
     context = ""
+    branch = "both"
     if current_symptoms and current_days is None:
+        branch = "days"
         context = f"\nWe already have symptoms: {current_symptoms}. User is answering: 'How many days ago did symptoms start?' Extract ONLY days_since_onset."
     elif current_days is not None and not current_symptoms:
+        branch = "symptoms"
         context = f"\nWe already know onset was {current_days} days ago. User is answering: 'What symptoms?' Extract ONLY symptoms."
     
     prompt = f"""
@@ -118,7 +88,7 @@ def run_agent(user_msg: str, history: list, current_state: dict = None):
     Remember: Timing phrases are NOT symptoms! Numbers alone are NOT symptoms!
     """
     
-    raw, history = generate(prompt, history, SYSTEM_PROMPT)
+    raw, history = cached_generate(prompt, history, SYSTEM_PROMPT, branch=branch)
     
     try:
         cleaned = strip_fences(raw)
@@ -126,18 +96,13 @@ def run_agent(user_msg: str, history: list, current_state: dict = None):
     except Exception:
         data = {}
     
-    # Validate and clean symptoms
-    if data.get("symptoms"):
-        valid_symptoms = [
-            s for s in data["symptoms"] 
-            if s and not is_temporal_phrase(s)
-        ]
-        data["symptoms"] = valid_symptoms if valid_symptoms else []
+    # Validate and clean symptoms, falling back to what we already collected (single pass)
+    data["symptoms"] = [
+        s for s in data.get("symptoms") or ()
+        if s and not is_temporal_phrase(s)
+    ] or current_symptoms
     
     # CRITICAL: Merge with existing state (preserve what we already collected)
-    if current_symptoms and not data.get("symptoms"):
-        data["symptoms"] = current_symptoms
-    
     if current_days is not None and data.get("days_since_onset") is None:
         data["days_since_onset"] = current_days
     
@@ -147,29 +112,29 @@ def run_agent(user_msg: str, history: list, current_state: dict = None):
     
     # Success: We have both
     if has_symptoms and has_days:
-        return json.dumps({
+        return {
             "symptoms": data["symptoms"],
             "days_since_onset": data["days_since_onset"]
-        }), history
+        }, history
     
     # Have symptoms, need days
     if has_symptoms and not has_days:
-        return json.dumps({
+        return {
             "symptoms": data["symptoms"],
             "awaiting_field": "days_since_onset",
             "console_output": "How many days ago did your symptoms start?"
-        }), history
+        }, history
     
     # Have days, need symptoms
     if not has_symptoms and has_days:
-        return json.dumps({
+        return {
             "days_since_onset": data["days_since_onset"],
             "awaiting_field": "symptoms",
             "console_output": "What symptoms are you experiencing?"
-        }), history
+        }, history
     
     # Have neither - start fresh
-    return json.dumps({
+    return {
         "awaiting_field": "symptoms",
         "console_output": "Please describe your symptoms."
-    }), history
\ No newline at end of file
+    }, history
\ No newline at end of file
@@ -1,12 +1,24 @@
 # api.py
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from graph_orchestrator import run_chat_flow
-import json
-import uuid
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from graph_orchestrator import run_chat_flow, get_chat_graph
+from firestore_session import get_session_history
+from config import warm_auth, warm_embedder, MODEL
+from helpers import compute_days_ago
+import config
+from collections import OrderedDict
+import asyncio
+import logging
+import os
+import secrets
+import time
 
-app = FastAPI()
+logger = logging.getLogger("api")
+
+# orjson serializes the plain-dict results directly, skipping jsonable_encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,31 +28,246 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def configure_logging():
+    # Done when the server starts rather than on import, so importing api leaves logging alone
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+@app.on_event("startup")
+async def warm_up():
+    # Warm-ups run in the background; a failure just means the first request pays for it
+    async def _warm(name, fn):
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(fn)
+            logger.info("%s warm-up done in %.0f ms", name, (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            logger.warning("%s warm-up failed: %s", name, e)
+
+    tasks = [
+        asyncio.create_task(_warm("Google auth", warm_auth)),
+        asyncio.create_task(_warm("Chat graph", get_chat_graph)),
+        # Builds the Gemini client and opens its connection
+        asyncio.create_task(_warm("Gemini", lambda: config.genai_client.models.get(model=MODEL))),
+        # Opens the Firestore channel (a missing doc isn't cached, so no session is touched)
+        asyncio.create_task(_warm("Firestore", lambda: get_session_history("__warmup__"))),
+        # Free text, so it goes past the fast paths and loads dateparser
+        asyncio.create_task(_warm("Date parser", lambda: compute_days_ago("last monday"))),
+    ]
+    # The chat flow doesn't embed today, so loading the e5 model at startup is opt-in
+    if os.getenv("EMBEDDER_WARMUP", "0") == "1":
+        tasks.append(asyncio.create_task(_warm("Embedder", warm_embedder)))
+    app.state.warmup_tasks = tasks  # keep references until they finish
+
+
 # ✅ UPDATED: Add user_id field
 class ChatInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     user_input: str
     session_id: str | None = None
     user_id: str | None = None          # NEW
     current_latitude: float | None = None
     current_longitude: float | None = None
+    client_request_id: str | None = None  # Same id on a client retry marks it as a duplicate
+
+
+def determine_awaiting_field(state: dict) -> str:
+    """Helper to determine what field we're waiting for based on state"""
+    # Check completion from end to beginning
+    if state.get("care_advice"):
+        return None  # Complete
+    
+    if state.get("report"):
+        return None  # Complete (care advice is auto-generated)
+    
+    # Check if we have location
+    location_json = state.get("location_json", {})
+    if not location_json.get("current_location_name"):
+        if state.get("location_city_state"):
+            return "venue"  # Have city, need venue
+        return "location_city_state"  # Need city
+    
+    # Check if we have exposure
+    if not state.get("exposure_location_name") or state.get("days_since_exposure") is None:
+        # Check what's missing
+        if state.get("exposure_awaiting_field"):
+            return state.get("exposure_awaiting_field")
+        return "exposure_location"
+    
+    # Check if we have diagnosis
+    diagnosis = state.get("diagnosis", {})
+    if not diagnosis.get("final_diagnosis"):
+        if "awaiting_field" in diagnosis and diagnosis["awaiting_field"] == "clarifier_answer":
+            return "clarifier_answer"
+        return "diagnosis"  # Waiting for diagnosis to complete
+    
+    # Check if we have symptoms
+    if not state.get("symptoms") or state.get("days_since_onset") is None:
+        if state.get("symptoms"):
+            return "days_since_onset"
+        return "symptoms"
+    
+    return None
+
+
+@app.get("/session/{session_id}")
+async def get_session_state(session_id: str):
+    """
+    Return current session state for frontend recovery.
+    Allows app to resume conversation after restart.
+    """
+    try:
+        session = await asyncio.to_thread(get_session_history, session_id)
+        
+        if not session:
+            return {
+                "exists": False,
+                "message": "No session found"
+            }
+        
+        state = session.get("state", {})
+        
+        # Determine what we're currently waiting for
+        awaiting_field = determine_awaiting_field(state)
+        
+        # Build response with all relevant state
+        response = {
+            "exists": True,
+            "symptoms": state.get("symptoms"),
+            "days_since_onset": state.get("days_since_onset"),
+            "diagnosis": state.get("diagnosis"),
+            "exposure_location_name": state.get("exposure_location_name"),
+            "days_since_exposure": state.get("days_since_exposure"),
+            "location_city_state": state.get("location_city_state"),
+            "location_venue": state.get("location_venue"),
+            "report": state.get("report"),
+            "care_advice": state.get("care_advice"),
+            "awaiting_field": awaiting_field,
+            "is_complete": bool(state.get("care_advice"))  # Complete if we have care advice
+        }
+        
+        logger.info("📋 Session %s... state retrieved: awaiting=%s", session_id[:8], awaiting_field)
+        return response
+        
+    except Exception as e:
+        logger.error("❌ Error fetching session state: %s", e)
+        return {
+            "exists": False,
+            "error": str(e)
+        }
+
 
-@app.post("/chat")
+def infer_awaiting_field(result: dict) -> str:
+    """Best-effort guess of which field the bot's question is asking for, for frontend state tracking."""
+    if not result.get("console_output") or result.get("care_advice"):
+        return None
+    console = result.get("console_output", "").lower()
+    
+    if "symptoms" in console or "experiencing" in console:
+        return "symptoms"
+    elif "days ago" in console or "when did" in console:
+        return "days_since_onset"
+    elif "exposed" in console or "where" in console and "exposure" in console:
+        return "exposure_location"
+    elif "city" in console or "state" in console:
+        return "location_city_state"
+    elif "venue" in console or "restaurant" in console or "building" in console:
+        return "venue"
+    return None
+
+
+# Retries and double-taps resend the same message within moments. A message is only a
+# duplicate if it carries the same client_request_id, or if it repeats the text while the
+# session is still on the turn the first copy was accepted at - answering "yes" again to
+# the next question is a new turn, not a duplicate. Duplicates join the in-flight run;
+# a finished run is replayed briefly, but only for an explicit client_request_id.
+_REPLAY_TTL_SECONDS = 3.0
+_REPLAY_MAX_ENTRIES = 1024
+_recent_responses = {}  # dedup key -> (expires_at, result)
+_inflight_requests = {}  # dedup key -> asyncio.Future
+_SESSION_TURNS_MAX = 4096
+_session_turns = OrderedDict()  # session_id -> turns completed by this process
+
+
+def _dedup_key(input_data: ChatInput) -> tuple:
+    if input_data.client_request_id:
+        return (input_data.session_id, "request", input_data.client_request_id)
+    turn = _session_turns.get(input_data.session_id, 0)
+    return (input_data.session_id, "turn", turn, input_data.user_input)
+
+
+def _count_turn(session_id: str):
+    _session_turns[session_id] = _session_turns.get(session_id, 0) + 1
+    _session_turns.move_to_end(session_id)
+    if len(_session_turns) > _SESSION_TURNS_MAX:
+        _session_turns.popitem(last=False)
+
+
+def _remember_response(key, result):
+    now = time.monotonic()
+    if len(_recent_responses) >= _REPLAY_MAX_ENTRIES:
+        for stale in [k for k, (exp, _) in _recent_responses.items() if exp <= now]:
+            del _recent_responses[stale]
+    _recent_responses[key] = (now + _REPLAY_TTL_SECONDS, result)
+
+
+@app.post("/chat", response_model=None)
 async def chat_endpoint(input_data: ChatInput):
-    print(f"\n📥 Received input: {input_data.user_input}")
-    session_id = input_data.session_id or str(uuid.uuid4())
-    print(f"📌 Using session ID: {session_id}")
+    logger.info("📥 Received input: %s", input_data.user_input)
+    if not input_data.session_id:
+        # Fresh session - nothing to deduplicate against
+        return await _run_chat(input_data, secrets.token_hex(16))
+
+    key = _dedup_key(input_data)
+    cached = _recent_responses.get(key)
+    if cached and cached[0] > time.monotonic():
+        logger.info("♻️ Replaying response for duplicate submission")
+        return dict(cached[1])
+
+    inflight = _inflight_requests.get(key)
+    if inflight is not None:
+        logger.info("♻️ Joining in-flight duplicate submission")
+        return dict(await asyncio.shield(inflight))
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight_requests[key] = future
+    try:
+        result = await _run_chat(input_data, input_data.session_id)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved so an unjoined failure isn't logged twice
+        raise
+    else:
+        future.set_result(result)
+        _count_turn(input_data.session_id)
+        if input_data.client_request_id:
+            _remember_response(key, result)
+        return dict(result)
+    finally:
+        _inflight_requests.pop(key, None)
+
+
+async def _run_chat(input_data: ChatInput, session_id: str) -> dict:
+    logger.debug("📌 Using session ID: %s", session_id)
     
-    # NEW: Log user ID (only in backend console, not sent to user)
+    # Log user ID (only in backend logs, not sent to user)
     if input_data.user_id:
-        print(f"👤 [Backend] User ID: {input_data.user_id}")
+        logger.debug("👤 User ID: %s", input_data.user_id)
     else:
-        print(f"👤 [Backend] No user_id provided, will use fallback")
+        logger.debug("👤 No user_id provided, will use fallback")
     
     if input_data.current_latitude is not None and input_data.current_longitude is not None:
-        print(f"📍 Location provided: ({input_data.current_latitude}, {input_data.current_longitude})")
+        logger.debug("📍 Location provided: (%s, %s)", input_data.current_latitude, input_data.current_longitude)
 
-    # Pass everything to orchestrator
-    result, _ = run_chat_flow(
+    # Pass everything to orchestrator. The flow makes blocking LLM/Firestore/Maps calls,
+    # so run it on a worker thread to keep the event loop free for other sessions.
+    result, _ = await asyncio.to_thread(
+        run_chat_flow,
         user_input=input_data.user_input, 
         session_id=session_id,
         user_id=input_data.user_id,
@@ -49,11 +276,14 @@ async def chat_endpoint(input_data: ChatInput):
     )
 
     if result:
-        print("📤 Full result object:", json.dumps(result, indent=2))
+        logger.debug("📤 Full result object: %s", result)
         result["session_id"] = session_id
+        awaiting_field = infer_awaiting_field(result)
+        if awaiting_field:
+            result["awaiting_field"] = awaiting_field
         return result
     else:
-        print("⚠️ No result returned from orchestrator.")
+        logger.warning("⚠️ No result returned from orchestrator.")
         raise HTTPException(status_code=500, detail="No response generated")
     
 @app.get("/health")
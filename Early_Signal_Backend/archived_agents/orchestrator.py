@@ -1,10 +1,15 @@
-import json
+import logging
+import orjson
+import re
 import sys
 from datetime import datetime, timezone
+from types import MappingProxyType
 import uuid
 
+import xxhash
+
 from helpers import (
-    normalize_agent_response, parse_json_from_response,
+    normalize_agent_response,
     serialize_history, deserialize_history
 )
 from config import PROJECT_ID, PINECONE_INDEX_NAME, TABLE_ID
@@ -17,7 +22,26 @@ from agents.care_agent import run_agent as run_care
 
 from firestore_session import get_session_history, save_session_history
 
-REPORT_COUNTER = 0
+logger = logging.getLogger("orchestrator")
+
+_DEFAULT_STATE = MappingProxyType({
+    "step": "symptom",
+    "symptoms": None,
+    "days_since_onset": None,
+    "diagnosis": None,
+    "exposure_location_name": None,
+    "days_since_exposure": None,
+    "exposure_latitude": None,
+    "exposure_longitude": None,
+    "location_city_state": None,
+    "location_venue": None,
+    "location_json": None,
+    "report": None,
+    "care_advice": None,
+    "location_prompted": False,
+    "awaiting_exposure_field": None,
+    "awaiting_location_field": None,
+})
 
 def check_environment():
     required = [PROJECT_ID, PINECONE_INDEX_NAME, TABLE_ID]
@@ -26,17 +50,22 @@ def check_environment():
         return False
     return True
 
+# Substring match, same as the old word loop ("yesterday"/"today" are covered by "day")
+_TIME_WORD_RE = re.compile(r"day|week|ago", re.IGNORECASE)
+
 def is_valid_symptom_list(symptoms):
     if not symptoms or not isinstance(symptoms, list):
         return False
-    invalid = all(any(word in s.lower() for word in ['day', 'week', 'ago', 'yesterday', 'today']) for s in symptoms)
-    return not invalid
+    return not all(_TIME_WORD_RE.search(s) for s in symptoms)
+
+_ALERTABLE_CATEGORIES = frozenset(("airborne", "waterborne", "insect-borne", "foodborne"))
+_UNKNOWN_LOCATIONS = frozenset(("i don't know", "unknown", "not sure", "idk", "no idea"))
 
 def is_valid_location(loc):
     if not loc or not isinstance(loc, str):
         return False
     l = loc.strip().lower()
-    return l and l not in ["i don't know", "unknown", "not sure", "idk", "no idea"]
+    return l and l not in _UNKNOWN_LOCATIONS
 
 def is_valid_days(days):
     if days is None:
@@ -48,8 +77,6 @@ def is_valid_days(days):
         return False
 
 def run_chat_flow(user_input: str, session_id: str = None):
-    global REPORT_COUNTER
-
     if not session_id:
         session_id = str(uuid.uuid4())
 
@@ -62,29 +89,8 @@ def run_chat_flow(user_input: str, session_id: str = None):
 
     history = deserialize_history(session.get("history", []))
 
-    default_state = {
-        "step": "symptom",
-        "symptoms": None,
-        "days_since_onset": None,
-        "diagnosis": None,
-        "exposure_location_name": None,
-        "days_since_exposure": None,
-        "exposure_latitude": None,
-        "exposure_longitude": None,
-        "location_city_state": None,
-        "location_venue": None,
-        "location_json": None,
-        "report": None,
-        "care_advice": None,
-        "clarifier_context": [],
-        "location_prompted": False,
-        "awaiting_exposure_field": None,
-        "awaiting_location_field": None,
-    }
-    state = session.get("state", {})
-    for k, v in default_state.items():
-        if k not in state:
-            state[k] = v
+    # clarifier_context gets a fresh list: the diagnostic step appends to it in place
+    state = {**_DEFAULT_STATE, "clarifier_context": [], **(session.get("state") or {})}
 
     result = {
         "diagnosis": None,
@@ -93,6 +99,15 @@ def run_chat_flow(user_input: str, session_id: str = None):
         "console_output": ""
     }
 
+    def _persist(**extra):
+        # Serialize once per save; the same list is what the caller gets back
+        ser = serialize_history(history)
+        save_session_history(session_id, {"history": ser, "state": state, **extra})
+        return ser
+
+    def _persist_and_return(**extra):
+        return result, _persist(**extra)
+
     if not user_input and state["step"] == "symptom":
         result["console_output"] = "⚠️ Please describe your symptoms to begin."
         return result, serialize_history(history)
@@ -104,35 +119,33 @@ def run_chat_flow(user_input: str, session_id: str = None):
     try:
         # --- SYMPTOM STEP ---
         if state["step"] == "symptom":
-            print("=== SYMPTOM STEP ===")
-            print("State BEFORE agent call:", state)
-            print("User input:", user_input)
-            sym_json, history = run_symptom(user_input, history)
-            sym = parse_json_from_response(sym_json) or {}
-            print("Agent output:", sym)
+            logger.debug("=== SYMPTOM STEP === state=%s user_input=%r", state, user_input)
+            sym, history = run_symptom(user_input, history, {
+                "current_symptoms": state.get("symptoms") or [],
+                "current_days": state.get("days_since_onset")
+            })
+            sym = sym or {}
+            logger.debug("Symptom agent output: %s", sym)
             if "symptoms" in sym and is_valid_symptom_list(sym["symptoms"]):
                 state["symptoms"] = sym["symptoms"]
             if "days_since_onset" in sym and sym["days_since_onset"] is not None:
                 state["days_since_onset"] = sym["days_since_onset"]
 
-            print("State AFTER merge:", state)
+            logger.debug("State AFTER merge: %s", state)
 
             if not state.get("symptoms"):
                 result["console_output"] = sym.get("console_output", "Can you describe your symptoms?")
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                return result, serialize_history(history)
+                return _persist_and_return()
             if state.get("days_since_onset") is None:
                 result["console_output"] = sym.get("console_output", "How many days ago did these symptoms begin?")
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                return result, serialize_history(history)
+                return _persist_and_return()
 
             state["step"] = "diagnostic"
-            save_session_history(session_id, {"history": serialize_history(history), "state": state})
+            _persist()
 
         # --- DIAGNOSTIC STEP ---
         if state["step"] == "diagnostic":
-            print("=== DIAGNOSTIC STEP ===")
-            print("State entering diagnostic:", state)
+            logger.debug("=== DIAGNOSTIC STEP === state=%s", state)
             diag_payload = {
                 "symptoms": state["symptoms"],
                 "days_since_onset": state["days_since_onset"],
@@ -143,48 +156,45 @@ def run_chat_flow(user_input: str, session_id: str = None):
                     "question": session["last_clarifier_question"],
                     "answer": user_input
                 })
-            diag_json, history = run_diagnostic(json.dumps(diag_payload), history)
-            diag = parse_json_from_response(diag_json)
-            print("Diagnostic agent output:", diag)
+            diag, history = run_diagnostic(orjson.dumps(diag_payload).decode(), history)
+            logger.debug("Diagnostic agent output: %s", diag)
             if "awaiting_field" in diag and diag["awaiting_field"] == "clarifier_answer":
                 session["last_clarifier_question"] = diag["last_clarifier_question"]
                 state["clarifier_context"] = diag.get("clarifier_context", [])
                 result["console_output"] = diag.get("console_output", "Please answer:")
-                save_session_history(session_id, {"history": serialize_history(history), "state": state, "last_clarifier_question": session.get("last_clarifier_question")})
-                return result, serialize_history(history)
+                return _persist_and_return(last_clarifier_question=session.get("last_clarifier_question"))
             state["diagnosis"] = diag
             result["diagnosis"] = diag
             if diag.get("final_diagnosis") == "Unknown (insufficient data)":
                 result["console_output"] = "❌ We couldn't identify your condition based on the data. Please consult a professional."
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                return result, serialize_history(history)
+                return _persist_and_return()
             if diag.get("confidence", 0) < 0.5:
                 result["console_output"] = f"⚠️ Low confidence in diagnosis: {diag['final_diagnosis']}"
             else:
                 result["console_output"] = f"🧪 Most Likely Diagnosis: {diag['final_diagnosis']} ({diag['confidence']:.0%})"
             state["step"] = "exposure"
-            save_session_history(session_id, {"history": serialize_history(history), "state": state})
+            _persist()
 
         # --- EXPOSURE STEP ---
         if state["step"] == "exposure":
-            print("=== EXPOSURE STEP ===")
-            print("State entering exposure:", state)
+            logger.debug("=== EXPOSURE STEP === state=%s", state)
             # If not yet filled, ask for location first
             if not state.get("exposure_location_name"):
-                exp_payload = {
-                    "illness_category": state["diagnosis"]["illness_category"],
-                    "diagnosis": state["diagnosis"]["final_diagnosis"],
-                    "symptom_summary": ", ".join(state["symptoms"]),
-                    "days_since_exposure": state["days_since_onset"]
-                }
+                # Follow-up turns only send the answer; the summary is built just for the first ask
                 if state["awaiting_exposure_field"] == "location" and user_input:
                     exp_payload = {
                         "awaiting_field": "exposure_followup",
                         "user_input": user_input,
                     }
-                exp_json, history = run_exposure(json.dumps(exp_payload), history)
-                exp = parse_json_from_response(exp_json)
-                print("Exposure agent output:", exp)
+                else:
+                    exp_payload = {
+                        "illness_category": state["diagnosis"]["illness_category"],
+                        "diagnosis": state["diagnosis"]["final_diagnosis"],
+                        "symptom_summary": ", ".join(state["symptoms"]),
+                        "days_since_exposure": state["days_since_onset"]
+                    }
+                exp, history = run_exposure(orjson.dumps(exp_payload).decode(), history)
+                logger.debug("Exposure agent output: %s", exp)
                 if "exposure_location_name" in exp and is_valid_location(exp["exposure_location_name"]):
                     state["exposure_location_name"] = exp["exposure_location_name"]
                     state["exposure_latitude"] = exp.get("exposure_latitude")
@@ -193,21 +203,18 @@ def run_chat_flow(user_input: str, session_id: str = None):
                     if not is_valid_days(state["days_since_exposure"]):
                         state["awaiting_exposure_field"] = "days"
                         result["console_output"] = f"How many days ago were you at {state['exposure_location_name']}?"
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                        return result, serialize_history(history)
+                        return _persist_and_return()
                     else:
                         state["step"] = "location"
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
+                        _persist()
                 elif "awaiting_field" in exp and exp["awaiting_field"] == "exposure_followup":
                     state["awaiting_exposure_field"] = "location"
                     result["console_output"] = exp.get("console_output", "Please specify where you think you were exposed.")
-                    save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                    return result, serialize_history(history)
+                    return _persist_and_return()
                 else:
                     state["awaiting_exposure_field"] = "location"
                     result["console_output"] = "Where do you think you were exposed? (Please specify the venue or city.)"
-                    save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                    return result, serialize_history(history)
+                    return _persist_and_return()
             elif not is_valid_days(state.get("days_since_exposure")):
                 # Prompt for days since exposure
                 if user_input and state["awaiting_exposure_field"] == "days":
@@ -215,133 +222,120 @@ def run_chat_flow(user_input: str, session_id: str = None):
                         "awaiting_field": "exposure_followup",
                         "user_input": user_input,
                     }
-                    exp_json, history = run_exposure(json.dumps(exp_payload), history)
-                    exp = parse_json_from_response(exp_json)
+                    exp, history = run_exposure(orjson.dumps(exp_payload).decode(), history)
                     if "days_since_exposure" in exp and is_valid_days(exp["days_since_exposure"]):
                         state["days_since_exposure"] = exp["days_since_exposure"]
                         state["step"] = "location"
                         state["awaiting_exposure_field"] = None
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
+                        _persist()
                     else:
                         result["console_output"] = exp.get("console_output", "How many days ago were you at your exposure location?")
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                        return result, serialize_history(history)
+                        return _persist_and_return()
                 else:
                     result["console_output"] = f"How many days ago were you at {state['exposure_location_name']}?"
                     state["awaiting_exposure_field"] = "days"
-                    save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                    return result, serialize_history(history)
+                    return _persist_and_return()
             else:
                 # Both are set, can move on
                 state["step"] = "location"
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
+                _persist()
 
         # --- LOCATION STEP ---
         if state["step"] == "location":
-            print("=== LOCATION STEP ===")
-            print("State entering location:", state)
+            logger.debug("=== LOCATION STEP === state=%s", state)
             if not state.get("location_city_state"):
                 # First ask for city/state
                 if state["awaiting_location_field"] == "city_state" and user_input:
                     loc_payload = user_input
-                    loc_json, history = run_location(loc_payload, history)
-                    loc = parse_json_from_response(loc_json)
+                    loc, history = run_location(loc_payload, history)
                     if "awaiting_field" in loc and loc["awaiting_field"] == "venue":
                         state["location_city_state"] = user_input
                         state["awaiting_location_field"] = "venue"
                         result["console_output"] = loc["console_output"]
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                        return result, serialize_history(history)
+                        return _persist_and_return()
                     else:
                         result["console_output"] = loc.get("console_output", "Please provide your city and state.")
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                        return result, serialize_history(history)
+                        return _persist_and_return()
                 else:
                     state["awaiting_location_field"] = "city_state"
                     result["console_output"] = "To help me understand your current situation, could you tell me what city and state you're in right now?"
-                    save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                    return result, serialize_history(history)
+                    return _persist_and_return()
             elif not state.get("location_venue"):
                 # Then ask for venue/address
                 if state["awaiting_location_field"] == "venue" and user_input:
-                    loc_payload = json.dumps({
+                    loc_payload = orjson.dumps({
                         "awaiting_field": "venue",
                         "user_input": user_input,
                         "city_state": state["location_city_state"]
-                    })
-                    loc_json, history = run_location(loc_payload, history)
-                    loc = parse_json_from_response(loc_json)
+                    }).decode()
+                    loc, history = run_location(loc_payload, history)
                     if "current_location_name" in loc and loc.get("location_category"):
                         state["location_venue"] = user_input
                         state["location_json"] = loc
                         state["step"] = "bq"
                         state["awaiting_location_field"] = None
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
+                        _persist()
                     else:
                         result["console_output"] = loc.get("console_output", "Please provide a venue, landmark, or address.")
-                        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                        return result, serialize_history(history)
+                        return _persist_and_return()
                 else:
                     state["awaiting_location_field"] = "venue"
                     result["console_output"] = f"Could you specify a venue name, landmark, neighborhood, cross-street, or address in {state['location_city_state']}?"
-                    save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                    return result, serialize_history(history)
+                    return _persist_and_return()
             else:
                 # Both set, move to BQ
                 state["step"] = "bq"
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
+                _persist()
 
         # --- BQ STEP ---
         if state["step"] == "bq":
-            print("=== BQ STEP ===")
-            print("State entering bq:", state)
-            REPORT_COUNTER_LOCAL = session.get("REPORT_COUNTER", REPORT_COUNTER) + 1
-            session["REPORT_COUNTER"] = REPORT_COUNTER_LOCAL
+            logger.debug("=== BQ STEP === state=%s", state)
+            # Derived from the session like graph_orchestrator; the old module counter was
+            # never persisted, so every process numbered its reports from 1
+            report_id = xxhash.xxh3_64_intdigest(session_id.encode()) % 1000000
+            diagnosis = state["diagnosis"]
+            illness_category = diagnosis["illness_category"]
+            location_json = state["location_json"]
             report = {
-                "report_id": REPORT_COUNTER_LOCAL,
+                "report_id": report_id,
                 "user_id": 1,
                 "report_timestamp": datetime.now(timezone.utc).isoformat(),
                 "symptom_text": ", ".join(state["symptoms"]),
                 "days_since_symptom_onset": state["days_since_onset"],
-                "final_diagnosis": state["diagnosis"]["final_diagnosis"],
-                "illness_category": state["diagnosis"]["illness_category"],
-                "confidence": state["diagnosis"]["confidence"],
-                "reasoning": state["diagnosis"].get("reasoning"),
+                "final_diagnosis": diagnosis["final_diagnosis"],
+                "illness_category": illness_category,
+                "confidence": diagnosis["confidence"],
+                "reasoning": diagnosis.get("reasoning"),
                 "exposure_location_name": state.get("exposure_location_name"),
                 "exposure_latitude": state.get("exposure_latitude"),
                 "exposure_longitude": state.get("exposure_longitude"),
                 "days_since_exposure": state.get("days_since_exposure"),
-                "current_location_name": state["location_json"].get("current_location_name") if state["location_json"] else "",
-                "current_latitude": state["location_json"].get("current_latitude") if state["location_json"] else "",
-                "current_longitude": state["location_json"].get("current_longitude") if state["location_json"] else "",
+                "current_location_name": location_json.get("current_location_name") if location_json else "",
+                "current_latitude": location_json.get("current_latitude") if location_json else "",
+                "current_longitude": location_json.get("current_longitude") if location_json else "",
                 "restaurant_visit": False,
                 "outdoor_activity": False,
                 "water_exposure": False,
-                "location_category": state["location_json"].get("location_category") if state["location_json"] else "",
-                "contagious_flag": state["diagnosis"]["illness_category"] == "airborne",
-                "alertable_flag": state["diagnosis"]["illness_category"] in [
-                    "airborne", "waterborne", "insect-borne", "foodborne"]
+                "location_category": location_json.get("location_category") if location_json else "",
+                "contagious_flag": illness_category == "airborne",
+                "alertable_flag": illness_category in _ALERTABLE_CATEGORIES
             }
             state["report"] = report
             result["report"] = report
-            result_json, history = run_bq(json.dumps(report), history)
-            result_bq = parse_json_from_response(result_json)
-            print("BQ agent output:", result_bq)
+            result_bq, history = run_bq(orjson.dumps(report).decode(), history)
+            logger.debug("BQ agent output: %s", result_bq)
             if result_bq.get("status") != "success":
                 result["console_output"] = result_bq.get("console_output", "❌ Submission error.")
-                save_session_history(session_id, {"history": serialize_history(history), "state": state})
-                return result, serialize_history(history)
+                return _persist_and_return()
             state["step"] = "care"
             result["console_output"] = "Your report has been submitted successfully! Here is some care advice for you."
-            save_session_history(session_id, {"history": serialize_history(history), "state": state})
+            _persist()
 
         # --- CARE STEP ---
         if state["step"] == "care":
-            print("=== CARE STEP ===")
-            print("State entering care:", state)
-            care_str, history = run_care(json.dumps(state["report"]), history)
-            care = parse_json_from_response(care_str)
-            print("Care agent output:", care)
+            logger.debug("=== CARE STEP === state=%s", state)
+            care, history = run_care(orjson.dumps(state["report"]).decode(), history)
+            logger.debug("Care agent output: %s", care)
             state["care_advice"] = care
             result["care_advice"] = care
             tips = care.get("self_care_tips", [])
@@ -349,11 +343,9 @@ def run_chat_flow(user_input: str, session_id: str = None):
             care_msg = "\n".join(f"• {tip}" for tip in tips)
             result["console_output"] += f"\n\n🩺 Self-Care Tips:\n{care_msg}\n\n📞 Seek help if: {when_to_seek}"
             state["step"] = "done"
-            save_session_history(session_id, {"history": serialize_history(history), "state": state})
-            return result, serialize_history(history)
+            return _persist_and_return()
 
-        save_session_history(session_id, {"history": serialize_history(history), "state": state})
-        return result, serialize_history(history)
+        return _persist_and_return()
 
     except Exception as e:
         print(f"⚠️ Top-level error: {e}")
@@ -1,10 +1,20 @@
 # config.py
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 from google.oauth2 import service_account
-from google.cloud import bigquery
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+    from pinecone import Pinecone
+    from sentence_transformers import SentenceTransformer
+
+    bq_client: bigquery.Client
+    pc: Pinecone
+    index: object
+    embedder: SentenceTransformer
 
 # Ensure GOOGLE_APPLICATION_CREDENTIALS is set
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(
@@ -28,65 +38,176 @@ CLUSTERS_SPATIAL_VIEW = "adsp-34002-ip07-early-signal.alerts.clusters_spatial_vi
 ALERT_TRACTS_VIEW = "adsp-34002-ip07-early-signal.alerts.alert_tracts_view"
 CLUSTERS_ALERT_VIEW = "adsp-34002-ip07-early-signal.alerts.clusters_alert_view"
 
-# Load service account credentials
-credentials = service_account.Credentials.from_service_account_file(SA_KEY_PATH)
+# Firebase (Firestore sessions) uses its own service account; resolved relative to this file
+FIREBASE_SA_KEY_PATH = os.environ.get(
+    "FIREBASE_SA_KEY_PATH", os.path.join(ROOT, "firebase_service_account.json")
+)
+
+# Load service account credentials once. Scoped up front so every Google client built
+# from them shares this object (and its access token) instead of a scoped copy.
+credentials = service_account.Credentials.from_service_account_file(
+    SA_KEY_PATH, scopes=["https://www.googleapis.com/auth/cloud-platform"]
+)
+_auth_lock = threading.Lock()
+
+
+def warm_auth():
+    """Fetch the access token now so the first BigQuery call doesn't pay for the OAuth round-trip."""
+    from google.auth.transport.requests import Request
+    with _auth_lock:
+        if not credentials.valid:
+            credentials.refresh(Request())
+
+# Heavy clients (BigQuery, Gemini, Pinecone, the e5 embedder) are built on first access
+# (PEP 562), so scripts that only need the constants above don't pay for them.
+
+
+def _build_bq_client():
+    from google.cloud import bigquery
+    return bigquery.Client(project=PROJECT_ID, credentials=credentials)
+
+
+def _build_genai_client():
+    from google import genai
+    return genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
+
+
+def _build_pc():
+    from pinecone import Pinecone
+    return Pinecone(api_key=PINECONE_API_KEY)
+
+
+def _build_index():
+    return __getattr__("pc").Index(PINECONE_INDEX_NAME)
+
+
+EMBEDDER_MODEL = "intfloat/e5-large-v2"
+
+
+def _build_embedder():
+    """
+    FP32 PyTorch by default, matching how the Pinecone vectors were built.
+    EMBEDDER_BACKEND=onnx runs the FP32 ONNX export instead, and EMBEDDER_BACKEND=onnx-int8
+    the int8-quantized one (its vectors drift slightly from the indexed ones, so opt-in only);
+    either falls back to PyTorch if ONNX Runtime isn't installed or the export can't load.
+    The ONNX backends need the extra: pip install "sentence-transformers[onnx]>=3.2".
+    """
+    from sentence_transformers import SentenceTransformer
+    backend = os.environ.get("EMBEDDER_BACKEND", "torch").lower()
+    if backend in ("onnx", "onnx-int8"):
+        model_kwargs = {"file_name": "onnx/model_qint8_avx512_vnni.onnx"} if backend == "onnx-int8" else {}
+        try:
+            return SentenceTransformer(EMBEDDER_MODEL, backend="onnx", model_kwargs=model_kwargs)
+        except Exception as e:
+            print(f"⚠️ ONNX embedder unavailable ({backend}), using PyTorch: {e}")
+    return SentenceTransformer(EMBEDDER_MODEL)
+
+
+_LAZY_ATTRS = {
+    "bq_client": _build_bq_client,
+    "genai_client": _build_genai_client,
+    "pc": _build_pc,
+    "index": _build_index,
+    "embedder": _build_embedder,
+}
 
-# Initialize BigQuery client at import time
-bq_client = bigquery.Client(project=PROJECT_ID, credentials=credentials)
 
-# Initialize Pinecone and embedder
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
-embedder = SentenceTransformer("intfloat/e5-large-v2")
+# One lock per client so e.g. BigQuery doesn't wait behind the embedder loading
+_build_locks = {name: threading.Lock() for name in _LAZY_ATTRS}
 
-def validate_config():
-    """Validate configuration settings and external connections."""
-    results = {
-        "google_auth": False,
-        "bigquery":    False,
-        "pinecone":    False,
-        "embeddings":  False,
-    }
+
+def __getattr__(name):
+    builder = _LAZY_ATTRS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _build_locks[name]:
+        if name not in globals():
+            globals()[name] = builder()
+    return globals()[name]
+
+
+def warm_embedder():
+    """Load the e5 model and run one throwaway encode so the first real request doesn't pay for it."""
+    __getattr__("embedder").encode("query: warmup", normalize_embeddings=True)
+
+
+_table_cache = {}  # table id -> bigquery.Table, fetched once per process
+_last_validation = None  # results of the last all-green validate_config run
+
+
+def get_table(table_id: str = TABLE_ID):
+    """bq_client.get_table, memoized so repeated schema/existence checks skip the round-trip."""
+    table = _table_cache.get(table_id)
+    if table is None:
+        table = _table_cache[table_id] = __getattr__("bq_client").get_table(table_id)
+    return table
+
+
+def _check_google_auth(force: bool):
+    _ = credentials  # Already loaded above
+    return True, f"✅ Google Auth: Service account loaded from {SA_KEY_PATH}"
+
+
+def _check_bigquery(force: bool):
+    if force:
+        _table_cache.pop(TABLE_ID, None)
+    get_table(TABLE_ID)
+    return True, f"✅ BigQuery: Connected to {TABLE_ID}"
+
+
+def _check_pinecone(force: bool):
+    idxs = __getattr__("pc").list_indexes().names()
+    if PINECONE_INDEX_NAME in idxs:
+        return True, f"✅ Pinecone: Index '{PINECONE_INDEX_NAME}' available"
+    return False, f"❌ Pinecone: Index '{PINECONE_INDEX_NAME}' not found"
+
+
+def _check_embeddings(force: bool):
+    test_emb = __getattr__("embedder").encode("test")
+    return True, f"✅ Embeddings: Model loaded, test embedding shape: {test_emb.shape}"
+
+
+# name -> (check, label used when it raises)
+_CHECKS = {
+    "google_auth": (_check_google_auth, "Google Auth Failed"),
+    "bigquery":    (_check_bigquery, "BigQuery Connection Failed"),
+    "pinecone":    (_check_pinecone, "Pinecone Connection Failed"),
+    "embeddings":  (_check_embeddings, "Embeddings Failed"),
+}
+
+
+def validate_config(force: bool = False):
+    """
+    Validate configuration settings and external connections.
+    The checks are independent and I/O bound, so they run concurrently; the report
+    is printed in a fixed order once all of them finish.
+    Once everything passes, later calls return that result without reconnecting
+    (pass force=True to re-check); a failing run is always re-checked next time.
+    """
+    global _last_validation
+    if _last_validation is not None and not force:
+        return dict(_last_validation)
+
+    def run(name):
+        check, failure_label = _CHECKS[name]
+        try:
+            return check(force)
+        except Exception as e:
+            return False, f"❌ {failure_label}: {e}"
+
+    with ThreadPoolExecutor(max_workers=len(_CHECKS)) as pool:
+        outcomes = dict(zip(_CHECKS, pool.map(run, _CHECKS)))
 
     print("\n" + "="*40)
     print("CONFIGURATION VALIDATION REPORT")
     print("="*40)
+    results = {}
+    for name, (ok, detail) in outcomes.items():
+        print(detail)
+        results[name] = ok
 
-    # 1) Google Auth
-    try:
-        _ = credentials  # Already loaded above
-        print(f"✅ Google Auth: Service account loaded from {SA_KEY_PATH}")
-        results["google_auth"] = True
-    except Exception as e:
-        print(f"❌ Google Auth Failed: {e}")
-
-    # 2) BigQuery
-    try:
-        bq_client.get_table(TABLE_ID)
-        print(f"✅ BigQuery: Connected to {TABLE_ID}")
-        results["bigquery"] = True
-    except Exception as e:
-        print(f"❌ BigQuery Connection Failed: {e}")
-
-    # 3) Pinecone
-    try:
-        idxs = pc.list_indexes().names()
-        if PINECONE_INDEX_NAME in idxs:
-            print(f"✅ Pinecone: Index '{PINECONE_INDEX_NAME}' available")
-            results["pinecone"] = True
-        else:
-            print(f"❌ Pinecone: Index '{PINECONE_INDEX_NAME}' not found")
-    except Exception as e:
-        print(f"❌ Pinecone Connection Failed: {e}")
-
-    # 4) Embeddings
-    try:
-        test_emb = embedder.encode("test")
-        print(f"✅ Embeddings: Model loaded, test embedding shape: {test_emb.shape}")
-        results["embeddings"] = True
-    except Exception as e:
-        print(f"❌ Embeddings Failed: {e}")
-
+    if all(results.values()):
+        _last_validation = dict(results)
     return results
 
 if __name__ == "__main__":
@@ -101,7 +222,8 @@ if __name__ == "__main__":
 __all__ = [
     "PROJECT_ID", "TABLE_ID", "LOCATION", "MODEL",
     "PINECONE_API_KEY", "PINECONE_INDEX_NAME",
-    "credentials", "bq_client",
+    "credentials", "warm_auth", "bq_client", "genai_client",
     "pc", "index", "embedder",
-    "validate_config"
+    "warm_embedder",
+    "get_table", "validate_config"
 ]
\ No newline at end of file
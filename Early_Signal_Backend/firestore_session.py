@@ -1,14 +1,24 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.exceptions import Aborted, Conflict
+from google.api_core.retry import Retry, if_exception_type
+from config import FIREBASE_SA_KEY_PATH
 from datetime import datetime, timezone
-import json
+import orjson
 import re
 from typing import List, Dict, Any
 
-cred = credentials.Certificate("firebase_service_account.json")
-firebase_admin.initialize_app(cred)
+# One app and one Firestore client per process, shared by every collection
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(credentials.Certificate(FIREBASE_SA_KEY_PATH))
 db = firestore.client()
 
+# Gemini Content repr: parts=[Part(...text='...')] role='user'; JSON form: "role": "model"
+_TEXT_RE = re.compile(r"text='([^']+)'")
+_CLEAN_ROLES = frozenset(("user", "model"))
+_ROLE_RE = re.compile(r"role='(model|system|error)'|\"role\": \"(model|system)\"")
+
+
 def _extract_content_from_item(item: Any) -> Dict[str, str]:
     """Robust extractor for Gemini-style message artifacts"""
     try:
@@ -18,29 +28,25 @@ def _extract_content_from_item(item: Any) -> Dict[str, str]:
         else:
             content = str(item)
 
-        # Match Gemini-like pattern: parts=[Part(...text='...')] role='user'
-        match = re.search(r"text='([^']+)'", content)
+        match = _TEXT_RE.search(content)
         if match:
             content_clean = match.group(1)
-        else:
-            # Try JSON fallback if it’s raw string
+        elif content.lstrip()[:1] == "{":
+            # Try JSON fallback if it’s a raw JSON object string
             try:
-                parsed = json.loads(content)
+                parsed = orjson.loads(content)
                 if isinstance(parsed, dict) and "content" in parsed:
                     content_clean = parsed["content"]
                 else:
                     content_clean = content
-            except:
+            except orjson.JSONDecodeError:
                 content_clean = content
+        else:
+            content_clean = content
 
         # Guess role
-        role = "user"
-        if "role='model'" in content or '"role": "model"' in content:
-            role = "model"
-        elif "role='system'" in content or '"role": "system"' in content:
-            role = "system"
-        elif "role='error'" in content:
-            role = "error"
+        role_match = _ROLE_RE.search(content)
+        role = (role_match.group(1) or role_match.group(2)) if role_match else "user"
 
         return {
             'role': role,
@@ -53,6 +59,21 @@ def _extract_content_from_item(item: Any) -> Dict[str, str]:
             'content': f"Extraction error: {str(e)}"
         }
         
+# Transient contention on the session document is retried; anything else is recorded
+_COMMIT_RETRY = Retry(predicate=if_exception_type(Aborted, Conflict), initial=0.1, maximum=5.0, multiplier=2.0, deadline=30.0)
+
+
+def _record_save_error(session_id: str, error: Exception, timestamp: datetime = None):
+    try:
+        db.collection("session_errors").document().set({
+            'session_id': session_id,
+            'error': str(error),
+            'timestamp': timestamp or datetime.now(timezone.utc)
+        })
+    except Exception as e:
+        print(f"Could not record save error: {e}")
+
+
 def get_session_history(session_id: str) -> dict:
     """Retrieve session document including history and state"""
     try:
@@ -76,11 +97,19 @@ def save_session_history(session_id: str, session_data: dict):
     Save session data (history, state, etc.) with metadata and size limits.
     session_data should be a dict with at least "history" and "state".
     """
+    now = datetime.now(timezone.utc)
     try:
         # Clean and validate history
         history = session_data.get("history", [])
         clean_history = []
         for item in history:
+            # Fast path: serialized {"role", "content"} dicts only need trimming
+            if isinstance(item, dict) and item.get("role") in _CLEAN_ROLES and isinstance(item.get("content"), str):
+                content = item["content"].strip()
+                if content:
+                    clean_history.append(item if len(item) == 2 and len(content) == len(item["content"]) <= 1000
+                                         else {'role': item["role"], 'content': content[:1000]})
+                continue
             cleaned = _extract_content_from_item(item)
             if cleaned['content'].strip():
                 clean_history.append(cleaned)
@@ -93,7 +122,7 @@ def save_session_history(session_id: str, session_data: dict):
         # Prepare data for save
         update_data = {
             'history': clean_history,
-            'last_updated': datetime.now(timezone.utc),
+            'last_updated': now,
             'history_count': len(clean_history),
             # Persist state and any other fields (clarifier, counter, etc)
             'state': session_data.get("state", {}),
@@ -104,17 +133,10 @@ def save_session_history(session_id: str, session_data: dict):
         # Remove None fields (Firestore cannot store None, only omit)
         update_data = {k: v for k, v in update_data.items() if v is not None}
 
-        # Batch write
-        batch = db.batch()
-        doc_ref = db.collection("sessions").document(session_id)
-        batch.set(doc_ref, update_data, merge=False)
-        batch.commit()
+        # Written before the turn is answered, so an acknowledged turn is never lost
+        db.collection("sessions").document(session_id).set(update_data, merge=False, retry=_COMMIT_RETRY)
         
     except Exception as e:
         print(f"Critical save error: {e}")
         # Emergency save
-        db.collection("session_errors").document().set({
-            'session_id': session_id,
-            'error': str(e),
-            'timestamp': datetime.now(timezone.utc)
-        })
\ No newline at end of file
+        _record_save_error(session_id, e, now)
\ No newline at end of file
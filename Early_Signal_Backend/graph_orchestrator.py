@@ -14,17 +14,20 @@ Removed in this version:
 - Clarification router function (no longer needed)
 """
 
-import json
+import logging
+import re
+import threading
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, Annotated, Literal
-import operator
 import uuid
+import weakref
+
+import xxhash
 
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from helpers import (
-    parse_json_from_response,
     serialize_history, 
     deserialize_history,
     reverse_geocode  # NEW - for GPS coordinate → location name conversion
@@ -39,14 +42,31 @@ from agents.cluster_validation_agent import run_agent as run_cluster_validation
 from agents.care_agent import run_agent as run_care
 from firestore_session import get_session_history, save_session_history
 
+logger = logging.getLogger("graph_orchestrator")
 
 # ============================================================================
 # STATE DEFINITION
 # ============================================================================
+def _merge_list(current: list, update: list) -> list:
+    """
+    Reducer for history/clarifier_context. Nodes may return the whole list they read
+    plus what they appended (history) or just the new items (clarifier_context); when
+    the update already starts with the current value it simply replaces it, otherwise
+    it is appended as a delta.
+    """
+    if not current:
+        return update
+    if not update:
+        return current
+    if len(update) >= len(current) and update[:len(current)] == current:
+        return update
+    return current + update
+
+
 class ChatState(TypedDict):
     """
     Shared state that flows through all nodes in the graph.
-    Using Annotated with operator.add for lists means new items get appended.
+    Using Annotated with _merge_list for lists means new items get appended.
     """
     # User interaction
     user_input: str
@@ -55,7 +75,7 @@ class ChatState(TypedDict):
     console_output: str
     
     # Conversation history (for LLM context)
-    history: Annotated[list, operator.add]
+    history: Annotated[list, _merge_list]
     
     # Symptom collection
     symptoms: list[str]
@@ -63,7 +83,7 @@ class ChatState(TypedDict):
     
     # Diagnosis
     diagnosis: dict
-    clarifier_context: Annotated[list, operator.add]  # Accumulates Q&A pairs
+    clarifier_context: Annotated[list, _merge_list]  # Accumulates Q&A pairs
     clarification_attempts: int  # Track how many times we've asked for clarification
     
     # Exposure tracking
@@ -84,21 +104,30 @@ class ChatState(TypedDict):
     report: dict
     cluster_validation: dict 
     care_advice: dict
+    report_number: int  # Bumped each time the user starts another report in this session
     
     # Control flags
     is_complete: bool
 
 
+# Runs care advice concurrently with the BigQuery insert in bq_submission_node
+_FINALIZE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="finalize")
+
+
 # ============================================================================
 # VALIDATION HELPERS
 # ============================================================================
+# Substring match, like the old word list ('yesterday'/'today' are covered by 'day')
+_TEMPORAL_RE = re.compile(r"day|week|ago", re.IGNORECASE)
+_INVALID_LOCS = frozenset(["i don't know", "unknown", "not sure", "idk", "no idea"])
+
+
 def is_valid_symptom_list(symptoms):
     """Check if symptom list is valid (not empty, not temporal phrases)"""
     if not symptoms or not isinstance(symptoms, list):
         return False
     # Invalid if ALL symptoms are temporal phrases
-    invalid = all(any(word in s.lower() for word in ['day', 'week', 'ago', 'yesterday', 'today']) 
-                  for s in symptoms)
+    invalid = all(_TEMPORAL_RE.search(s) for s in symptoms)
     return not invalid
 
 
@@ -107,19 +136,29 @@ def is_valid_location(loc):
     if not loc or not isinstance(loc, str):
         return False
     l = loc.strip().lower()
-    return l and l not in ["i don't know", "unknown", "not sure", "idk", "no idea"]
+    return l and l not in _INVALID_LOCS
 
 
 def is_valid_days(days):
     """Check if days value is valid (non-negative integer)"""
     if days is None:
         return False
+    # Common case: already an int (skips the int() call and try block)
+    if type(days) is int:
+        return days >= 0
     try:
         days = int(days)
         return days >= 0
     except Exception:
         return False
 
+_EMPTY = {}  # shared read-only default for .get() chains; never mutate
+_ALERTABLE_CATEGORIES = frozenset(("airborne", "waterborne", "insect-borne", "foodborne"))
+_REFINING_VALIDATIONS = frozenset(("ALTERNATIVE", "CONFIRMED"))
+_EXIT_WORDS = frozenset(("exit", "quit", "bye"))
+_NEW_REPORT_RE = re.compile(r"\b(new|reset|another|restart|start over|symptoms?)\b", re.I)
+
+
 def determine_start_node(state: dict) -> str:
     """
     Determine which node to start from based on current state.
@@ -141,16 +180,16 @@ def determine_start_node(state: dict) -> str:
     
     # Has location, ready for cluster validation
     # FIXED: GPS location alone shouldn't trigger submission - need exposure data too
-    if (state.get("location_json", {}).get("current_location_name") and
-        state.get("exposure_location_name")):
+    exposure_location = state.get("exposure_location_name")
+    if exposure_location and (state.get("location_json") or _EMPTY).get("current_location_name"):
         return "cluster_validation"
     
     # Has exposure, need location
-    if state.get("exposure_location_name") and state.get("days_since_exposure") is not None:
+    if exposure_location and state.get("days_since_exposure") is not None:
         return "location_collection"
     
     # Has diagnosis, need exposure (or waiting for exposure data)
-    diagnosis = state.get("diagnosis", {})
+    diagnosis = state.get("diagnosis") or _EMPTY
     if diagnosis.get("final_diagnosis") and "awaiting_field" not in diagnosis:
         return "exposure_collection"
     
@@ -178,6 +217,15 @@ def symptom_collection_node(state: ChatState) -> ChatState:
     current_symptoms = state.get("symptoms", [])
     current_days = state.get("days_since_onset")
     
+    # Already complete and nothing new to parse - no need to ask the agent
+    if (not (user_input or "").strip() and is_valid_symptom_list(current_symptoms)
+            and is_valid_days(current_days)):
+        return {
+            "symptoms": current_symptoms,
+            "days_since_onset": current_days,
+            "console_output": ""
+        }
+    
     # Prepare payload with current state so agent knows what we have
     symptom_payload = {
         "user_input": user_input,
@@ -185,9 +233,9 @@ def symptom_collection_node(state: ChatState) -> ChatState:
         "current_days": current_days
     }
     
-    # Call the symptom agent with state context
-    sym_json, updated_history = run_symptom(json.dumps(symptom_payload), history)
-    sym = parse_json_from_response(sym_json) or {}
+    # Call the symptom agent with state context (passed directly, no JSON round-trip)
+    sym, updated_history = run_symptom(user_input, history, symptom_payload)
+    sym = sym or {}
     
     # Update state with extracted symptoms
     updates = {
@@ -198,25 +246,28 @@ def symptom_collection_node(state: ChatState) -> ChatState:
     # Update with new values if provided, otherwise preserve current values
     if "symptoms" in sym and is_valid_symptom_list(sym["symptoms"]):
         updates["symptoms"] = sym["symptoms"]
-        current_symptoms = sym["symptoms"]
     elif current_symptoms:
         # Preserve existing symptoms if agent didn't return new ones
         updates["symptoms"] = current_symptoms
     
     if "days_since_onset" in sym and sym["days_since_onset"] is not None:
         updates["days_since_onset"] = sym["days_since_onset"]
-        current_days = sym["days_since_onset"]
     elif current_days is not None:
         # Preserve existing days if agent didn't return new ones
         updates["days_since_onset"] = current_days
     
-    # Check if we have BOTH symptoms and days
-    has_symptoms = bool(current_symptoms) and is_valid_symptom_list(current_symptoms)
-    has_days = current_days is not None and is_valid_days(current_days)
-    
     return updates
 
 
+def build_diagnosis_message(final_diag: str, confidence: float) -> str:
+    """Console text announcing a final diagnosis"""
+    if final_diag == "Unknown (insufficient data)":
+        return "We couldn't identify your condition. Please consult a healthcare professional."
+    if confidence < 0.5:
+        return f"Low confidence diagnosis: {final_diag} ({confidence:.0%})"
+    return f"Preliminary Diagnosis: {final_diag} ({confidence:.0%} confidence)"
+
+
 def diagnosis_node(state: ChatState) -> ChatState:
     """
     Node 2: Generate diagnosis from symptoms.
@@ -224,19 +275,22 @@ def diagnosis_node(state: ChatState) -> ChatState:
     """
     
     history = deserialize_history(state.get("history", []))
-    diagnosis = state.get("diagnosis", {})
+    diagnosis = state.get("diagnosis") or _EMPTY
     
     # Check if we're in clarification mode (diagnosis is waiting for answer)
     is_clarifying = "awaiting_field" in diagnosis and diagnosis["awaiting_field"] == "clarifier_answer"
     
-    # If we're clarifying, add the user's answer to context
-    clarifier_context = list(state.get("clarifier_context", []))
+    # If we're clarifying, add the user's answer to context. The full list goes back
+    # into state: resumed turns apply node updates with a plain dict.update (no reducer)
+    clarifier_context = state.get("clarifier_context") or []
+    new_context = []
     if is_clarifying and state.get("user_input"):
         last_question = diagnosis.get("console_output", "")
-        clarifier_context.append({
+        new_context = [{
             "question": last_question,
             "answer": state.get("user_input")
-        })
+        }]
+        clarifier_context = clarifier_context + new_context
     
     # Check if we've hit max clarifications - force final diagnosis
     attempts = state.get("clarification_attempts", 0)
@@ -251,15 +305,15 @@ def diagnosis_node(state: ChatState) -> ChatState:
     }
     
     # Call diagnostic agent (it handles clarification internally)
-    diag_json, updated_history = run_diagnostic(json.dumps(diag_payload), history)
-    diag = parse_json_from_response(diag_json)
+    diag, updated_history = run_diagnostic(diag_payload, history)
     
     updates = {
         "history": serialize_history(updated_history),
         "diagnosis": diag,
-        "console_output": "",
-        "clarifier_context": clarifier_context
+        "console_output": ""
     }
+    if new_context:
+        updates["clarifier_context"] = clarifier_context
     
     # Check if agent is asking for clarification (and we haven't hit limit)
     if "awaiting_field" in diag and diag["awaiting_field"] == "clarifier_answer" and not force_final:
@@ -282,12 +336,7 @@ def diagnosis_node(state: ChatState) -> ChatState:
         
         updates["diagnosis"] = clean_diagnosis
         
-        if final_diag == "Unknown (insufficient data)":
-            updates["console_output"] = "We couldn't identify your condition. Please consult a healthcare professional."
-        elif confidence < 0.5:
-            updates["console_output"] = f"Low confidence diagnosis: {final_diag} ({confidence:.0%})"
-        else:
-            updates["console_output"] = f"Preliminary Diagnosis: {final_diag} ({confidence:.0%} confidence)"
+        updates["console_output"] = build_diagnosis_message(final_diag, confidence)
         
         # Reset clarification counter
         updates["clarification_attempts"] = 0
@@ -308,15 +357,24 @@ def exposure_collection_node(state: ChatState) -> ChatState:
     Node 3: Collect exposure location and timing.
     """
     
-    history = deserialize_history(state.get("history", []))
-    diagnosis = state.get("diagnosis", {})
     user_input = state.get("user_input", "")
     
+    # Exposure already complete and nothing new to parse - skip the agent
+    if (not (user_input or "").strip() and is_valid_location(state.get("exposure_location_name"))
+            and is_valid_days(state.get("days_since_exposure"))):
+        return {
+            "exposure_awaiting_field": None,
+            "console_output": ""
+        }
+    
+    history = deserialize_history(state.get("history", []))
+    diagnosis = state.get("diagnosis") or _EMPTY
+    
     # Prepare payload for exposure agent
     exp_payload = {
         "illness_category": diagnosis.get("illness_category", ""),
         "diagnosis": diagnosis.get("final_diagnosis", ""),
-        "symptom_summary": ", ".join(state.get("symptoms", [])),
+        "symptom_summary": ", ".join(state.get("symptoms") or ()),
         "days_since_exposure": state.get("days_since_onset")
     }
     
@@ -331,8 +389,7 @@ def exposure_collection_node(state: ChatState) -> ChatState:
             exp_payload["partial_days"] = state.get("exposure_partial_days")
     
     # Call exposure agent WITH STATE
-    exp_json, updated_history = run_exposure(json.dumps(exp_payload), history, state)
-    exp = parse_json_from_response(exp_json)
+    exp, updated_history = run_exposure(exp_payload, history, state)
         
     updates = {
         "history": serialize_history(updated_history),
@@ -375,7 +432,7 @@ def location_collection_node(state: ChatState) -> ChatState:
     """
     
     # NEW: Check if location already provided via GPS
-    location_json = state.get("location_json", {})
+    location_json = state.get("location_json") or _EMPTY
     if (location_json.get("current_location_name") and 
         location_json.get("current_latitude") is not None and
         location_json.get("current_longitude") is not None):
@@ -401,15 +458,14 @@ def location_collection_node(state: ChatState) -> ChatState:
         loc_payload = user_input
     else:
         # Second interaction - we have city, now get venue
-        loc_payload = json.dumps({
+        loc_payload = {
             "awaiting_field": "venue",
             "user_input": user_input,
             "city_state": state.get("location_city_state")
-        })
+        }
     
     # Call location agent
-    loc_json, updated_history = run_location(loc_payload, history)
-    loc = parse_json_from_response(loc_json)
+    loc, updated_history = run_location(loc_payload, history)
     
     updates = {
         "history": serialize_history(updated_history),
@@ -442,10 +498,16 @@ def bq_submission_node(state: ChatState) -> ChatState:
     history = deserialize_history(state.get("history", []))
     
     # Build the report from collected state
-    report_id = hash(state.get("session_id", "")) % 1000000
-    
-    diagnosis = state.get("diagnosis", {})
-    location_json = state.get("location_json", {})
+    # xxh3 is stable across restarts (built-in hash() is salted per process);
+    # later reports in the same session get their own id
+    report_key = state.get("session_id", "")
+    if state.get("report_number"):
+        report_key = f"{report_key}#{state['report_number']}"
+    report_id = xxhash.xxh3_64_intdigest(report_key.encode()) % 1000000
+    
+    diagnosis = state.get("diagnosis") or _EMPTY
+    location_json = state.get("location_json") or _EMPTY
+    illness_category = diagnosis.get("illness_category")
     
     # Get user_id from state with fallback to "1" (as string)
     user_id = state.get("user_id")
@@ -462,7 +524,7 @@ def bq_submission_node(state: ChatState) -> ChatState:
         "report_id": report_id,
         "user_id": user_id_str,  # STRING, not integer!
         "report_timestamp": datetime.now(timezone.utc).isoformat(),
-        "symptom_text": ", ".join(state.get("symptoms", [])),
+        "symptom_text": ", ".join(state.get("symptoms") or ()),
         "days_since_symptom_onset": state.get("days_since_onset"),
         "final_diagnosis": diagnosis.get("final_diagnosis", ""),
         "illness_category": diagnosis.get("illness_category", ""),
@@ -479,23 +541,31 @@ def bq_submission_node(state: ChatState) -> ChatState:
         "outdoor_activity": False,
         "water_exposure": False,
         "location_category": location_json.get("location_category", ""),
-        "contagious_flag": diagnosis.get("illness_category") == "airborne",
-        "alertable_flag": diagnosis.get("illness_category") in [
-            "airborne", "waterborne", "insect-borne", "foodborne"
-        ]
+        "contagious_flag": illness_category == "airborne",
+        "alertable_flag": illness_category in _ALERTABLE_CATEGORIES
     }
     
     print(f"[Backend] Submitting report with user_id: {user_id_str}")
     
+    # Care advice only needs the report, so generate it while the BigQuery insert runs
+    # (care_advice_node then just finalizes). BQ doesn't touch history; care gets its own copy.
+    care_future = _FINALIZE_POOL.submit(run_care, report, list(history))
+    
     # Call BQ submission agent
-    result_json, updated_history = run_bq(json.dumps(report), history)
-    result_bq = parse_json_from_response(result_json)
+    result_bq, updated_history = run_bq(report, history)
     
     updates = {
         "history": serialize_history(updated_history),
         "report": report
     }
     
+    try:
+        care, care_history = care_future.result()
+        updates["care_advice"] = care
+        updates["history"] = serialize_history(care_history)
+    except Exception as e:
+        print(f"⚠️ Care advice generation failed, retrying in care_advice node: {e}")
+    
     if result_bq.get("status") == "success":
         updates["console_output"] = ""
     else:
@@ -513,7 +583,7 @@ def cluster_validation_node(state: ChatState) -> ChatState:
     """
     
     history = deserialize_history(state.get("history", []))
-    diagnosis = state.get("diagnosis", {})
+    diagnosis = state.get("diagnosis") or _EMPTY
     
     # Extract data needed for cluster validation
     user_disease = diagnosis.get("final_diagnosis")
@@ -524,7 +594,7 @@ def cluster_validation_node(state: ChatState) -> ChatState:
     illness_category = diagnosis.get("illness_category")
     
     # NEW: Get current location coordinates
-    location_json = state.get("location_json", {})
+    location_json = state.get("location_json") or _EMPTY
     current_lat = location_json.get("current_latitude")
     current_lon = location_json.get("current_longitude")
     
@@ -554,11 +624,10 @@ def cluster_validation_node(state: ChatState) -> ChatState:
     print(f"🔍 Validating diagnosis against outbreak clusters...")
     
     # Call cluster validation agent
-    validation_json, updated_history = run_cluster_validation(
-        json.dumps(validation_payload), 
+    validation_result, updated_history = run_cluster_validation(
+        validation_payload, 
         history
     )
-    validation_result = parse_json_from_response(validation_json)
         
     updates = {
         "history": serialize_history(updated_history),
@@ -573,7 +642,7 @@ def cluster_validation_node(state: ChatState) -> ChatState:
         print(f"✅ Cluster validation: {validation_type}")
         
         # Update diagnosis if cluster suggested an alternative
-        if validation_type in ["ALTERNATIVE", "CONFIRMED"]:
+        if validation_type in _REFINING_VALIDATIONS:
             refined_diagnosis = {
                 "final_diagnosis": validation_result.get("refined_diagnosis"),
                 "illness_category": diagnosis.get("illness_category"),
@@ -601,12 +670,18 @@ def care_advice_node(state: ChatState) -> ChatState:
     Final step before completion.
     """
     
+    # Already generated alongside the BigQuery insert
+    if state.get("care_advice"):
+        return {
+            "console_output": "",
+            "is_complete": True
+        }
+    
     history = deserialize_history(state.get("history", []))
-    report = state.get("report", {})
+    report = state.get("report") or _EMPTY
     
     # Call care agent
-    care_json, updated_history = run_care(json.dumps(report), history)
-    care = parse_json_from_response(care_json)
+    care, updated_history = run_care(report, history)
     
     return {
         "history": serialize_history(updated_history),
@@ -625,8 +700,10 @@ def route_after_symptoms(state: ChatState) -> Literal["diagnosis", END]:
     Decide if we have enough symptom info to proceed to diagnosis.
     If not, END to wait for user input.
     """
-    has_symptoms = bool(state.get("symptoms")) and is_valid_symptom_list(state.get("symptoms", []))
-    has_days = state.get("days_since_onset") is not None and is_valid_days(state.get("days_since_onset"))
+    symptoms = state.get("symptoms")
+    days = state.get("days_since_onset")
+    has_symptoms = bool(symptoms) and is_valid_symptom_list(symptoms)
+    has_days = days is not None and is_valid_days(days)
     
     if has_symptoms and has_days:
         return "diagnosis"
@@ -638,10 +715,11 @@ def route_after_diagnosis(state: ChatState) -> Literal["exposure_collection", EN
     Decide next step after diagnosis.
     Auto-routes to exposure immediately when diagnosis is final.
     """
-    diagnosis = state.get("diagnosis", {})
+    diagnosis = state.get("diagnosis") or _EMPTY
+    awaiting = "awaiting_field" in diagnosis
     
     # Check if we're waiting for clarification (must END to get user input)
-    if "awaiting_field" in diagnosis and diagnosis["awaiting_field"] == "clarifier_answer":
+    if awaiting and diagnosis["awaiting_field"] == "clarifier_answer":
         attempts = state.get("clarification_attempts", 0)
         if attempts < 3:
             return END
@@ -652,7 +730,7 @@ def route_after_diagnosis(state: ChatState) -> Literal["exposure_collection", EN
         return END
     
     # We have a final diagnosis - AUTO-ROUTE to exposure (no waiting for "ok")
-    if final_diag and "awaiting_field" not in diagnosis:
+    if final_diag and not awaiting:
         return "exposure_collection"
     
     # Default: wait for more processing
@@ -670,7 +748,7 @@ def route_after_exposure(state: ChatState) -> Literal["location_collection", "cl
         return END
     
     # NEW: Check if we already have GPS location
-    location_json = state.get("location_json", {})
+    location_json = state.get("location_json") or _EMPTY
     if (location_json.get("current_latitude") is not None and 
         location_json.get("current_longitude") is not None and
         location_json.get("current_location_name")):
@@ -686,7 +764,7 @@ def route_after_location(state: ChatState) -> Literal["cluster_validation", END]
     """
     Check if we have complete location info.
     """
-    has_full_data = bool(state.get("location_json", {}).get("current_location_name"))
+    has_full_data = bool((state.get("location_json") or _EMPTY).get("current_location_name"))
     
     if has_full_data:
         return "cluster_validation"
@@ -694,6 +772,35 @@ def route_after_location(state: ChatState) -> Literal["cluster_validation", END]
         return END
 
 
+# Resume table for mid-flow turns: node -> (node function, router, carry output).
+# Mirrors the graph's edges; a router returning END means "wait for user input".
+# Carried output is shown ahead of the next node's (diagnosis + first exposure question).
+_RESUME_FLOW = {
+    "diagnosis": (diagnosis_node, route_after_diagnosis, True),
+    "exposure_collection": (exposure_collection_node, route_after_exposure, False),
+    "location_collection": (location_collection_node, route_after_location, False),
+    "cluster_validation": (cluster_validation_node, lambda state: "bq_submission", False),
+    "bq_submission": (bq_submission_node, lambda state: "care_advice", False),
+    "care_advice": (care_advice_node, lambda state: END, False),
+}
+
+
+def _run_resume_flow(start_node: str, state: dict) -> dict:
+    """Run start_node and everything its routers lead to, updating state in place."""
+    carried = []
+    node = start_node
+    while node in _RESUME_FLOW:
+        node_func, router, carry = _RESUME_FLOW[node]
+        state.update(node_func(state))
+        node = router(state)
+        if carry and node != END and state.get("console_output"):
+            carried.append(state["console_output"])
+    
+    if carried:
+        state["console_output"] = "\n\n".join(filter(None, carried + [state.get("console_output")]))
+    return state
+
+
 # ============================================================================
 # GRAPH CONSTRUCTION
 # ============================================================================
@@ -765,15 +872,83 @@ def create_chat_graph():
     workflow.add_edge("bq_submission", "care_advice")
     workflow.add_edge("care_advice", END)
     
-    # Compile with checkpointing
-    memory = MemorySaver()
-    return workflow.compile(checkpointer=memory)
+    # No checkpointer: every turn starts from the Firestore state, so a per-thread
+    # checkpoint would never be read back (and would grow without bound if shared)
+    return workflow.compile()
+
+
+_chat_graph = None
+_chat_graph_lock = threading.Lock()
+
+
+def get_chat_graph():
+    """Compiled graph, built once per process and shared by all requests."""
+    global _chat_graph
+    if _chat_graph is None:
+        with _chat_graph_lock:
+            if _chat_graph is None:
+                _chat_graph = create_chat_graph()
+    return _chat_graph
 
 
 # ============================================================================
 # MAIN EXECUTION FUNCTION
 # ============================================================================
 
+# Starting value of every persisted ChatState field for a brand-new session.
+# The containers are shared across requests - nodes never mutate state values in place.
+_STATE_DEFAULTS = {
+    "symptoms": [],
+    "days_since_onset": None,
+    "diagnosis": {},
+    "clarifier_context": [],
+    "clarification_attempts": 0,
+    "exposure_location_name": None,
+    "exposure_latitude": None,
+    "exposure_longitude": None,
+    "days_since_exposure": None,
+    "exposure_awaiting_field": None,
+    "exposure_partial_location": None,
+    "exposure_partial_days": None,
+    "location_city_state": None,
+    "location_venue": None,
+    "location_json": {},
+    "report": None,
+    "cluster_validation": {},
+    "care_advice": None,
+    "report_number": 0,
+}
+
+# Carried over when a finished session starts another report: who and where the user is
+_NEW_REPORT_KEEP = ("user_id", "location_city_state", "location_venue", "location_json")
+
+
+def _new_report_state(saved: dict) -> dict:
+    """Saved state for the next report of a finished session: defaults plus _NEW_REPORT_KEEP."""
+    state = {**_STATE_DEFAULTS, "report_number": (saved.get("report_number") or 0) + 1}
+    for key in _NEW_REPORT_KEEP:
+        if saved.get(key) is not None:
+            state[key] = saved[key]
+    return state
+
+
+# Artifacts returned to the client only on the turn they first appear
+_NEW_OUTPUT_KEYS = ("care_advice", "report", "cluster_validation")
+
+
+# Per-session turn locks; an entry lives only while some turn holds or waits on it
+_session_locks = weakref.WeakValueDictionary()
+_session_locks_guard = threading.Lock()
+
+
+def _get_session_lock(session_id: str) -> threading.Lock:
+    with _session_locks_guard:
+        lock = _session_locks.get(session_id)
+        if lock is None:
+            lock = _session_locks[session_id] = threading.Lock()
+        return lock
+
+
 def run_graph_chat_flow(
     user_input: str, 
     session_id: str = None,
@@ -788,19 +963,16 @@ def run_graph_chat_flow(
     if not session_id:
         session_id = str(uuid.uuid4())
     
-    # Handle empty input at start
-    if not user_input:
-        session = get_session_history(session_id)
-        if not session or not session.get("state", {}).get("symptoms"):
-            return {
-                "diagnosis": None,
-                "care_advice": None,
-                "report": None,
-                "console_output": "Please describe your symptoms to begin."
-            }, []
-    
-    # Handle exit commands
-    if user_input and user_input.lower() in ("exit", "quit", "bye"):
+    # Turns of one session run one at a time, each starting from the state the
+    # previous turn saved; different sessions still run concurrently
+    with _get_session_lock(session_id):
+        return _run_turn(user_input, session_id, user_id, current_latitude, current_longitude)
+
+
+def _run_turn(user_input, session_id, user_id, current_latitude, current_longitude):
+    """One chat turn of run_graph_chat_flow; the caller holds the session's lock."""
+    # Handle exit commands (before touching Firestore)
+    if user_input and user_input.lower() in _EXIT_WORDS:
         return {
             "diagnosis": None,
             "care_advice": None,
@@ -808,7 +980,7 @@ def run_graph_chat_flow(
             "console_output": "Goodbye!"
         }, []
 
-    # Load session from Firestore
+    # Load session from Firestore - the one read for this turn
     session = get_session_history(session_id)
 
     if isinstance(session, list):
@@ -816,39 +988,48 @@ def run_graph_chat_flow(
     elif session is None:
         session = {"history": [], "state": {}}
     
-    # Initialize state from saved session
+    # Handle empty input at start
+    if not user_input and not (session.get("state") or _EMPTY).get("symptoms"):
+        return {
+            "diagnosis": None,
+            "care_advice": None,
+            "report": None,
+            "console_output": "Please describe your symptoms to begin."
+        }, []
+    
+    # Finished report: nothing a follow-up message can change, so skip the graph
+    # and the save - unless the user is asking to start over, which begins a fresh report
+    saved = session.get("state") or _EMPTY
+    if saved.get("care_advice") and saved.get("report"):
+        if not _NEW_REPORT_RE.search(user_input or ""):
+            return {
+                "diagnosis": None,
+                "care_advice": None,
+                "report": None,
+                "console_output": "Your report is complete. Start a new report to log another illness."
+            }, session.get("history", [])
+        saved = _new_report_state(saved)
+        session = {**session, "state": saved, "history": []}
+    
+    # Initialize state from saved session (saved keys override the defaults)
     initial_state = {
+        **_STATE_DEFAULTS,
+        **saved,
         "user_input": user_input,
         "session_id": session_id,
-        "user_id": user_id or session.get("state", {}).get("user_id") or "anonymous",  # NEW
+        "user_id": user_id or saved.get("user_id") or "anonymous",  # NEW
         "console_output": "",
-        "history": session.get("history", []),
-        "symptoms": session.get("state", {}).get("symptoms", []) or [],
-        "days_since_onset": session.get("state", {}).get("days_since_onset"),
-        "diagnosis": session.get("state", {}).get("diagnosis", {}),
-        "clarifier_context": session.get("state", {}).get("clarifier_context", []),
-        "clarification_attempts": session.get("state", {}).get("clarification_attempts", 0),
-        "exposure_location_name": session.get("state", {}).get("exposure_location_name"),
-        "exposure_latitude": session.get("state", {}).get("exposure_latitude"),
-        "exposure_longitude": session.get("state", {}).get("exposure_longitude"),
-        "days_since_exposure": session.get("state", {}).get("days_since_exposure"),
-        "exposure_awaiting_field": session.get("state", {}).get("exposure_awaiting_field"),
-        "exposure_partial_location": session.get("state", {}).get("exposure_partial_location"),
-        "exposure_partial_days": session.get("state", {}).get("exposure_partial_days"),
-        "location_city_state": session.get("state", {}).get("location_city_state"),
-        "location_venue": session.get("state", {}).get("location_venue"),
-        "location_json": session.get("state", {}).get("location_json", {}),
-        "report": session.get("state", {}).get("report"),
-        "cluster_validation": session.get("state", {}).get("cluster_validation", {}),
-        "care_advice": session.get("state", {}).get("care_advice"),
+        "history": session.get("history") or [],
         "is_complete": False
     }
+    if not initial_state["symptoms"]:
+        initial_state["symptoms"] = []
     
     # NEW: Add location coordinates to initial state if provided
     # BUT ONLY if we haven't already stored location AND we're past the exposure stage
     if current_latitude is not None and current_longitude is not None:
         # Check if we haven't already stored location
-        if not session.get("state", {}).get("location_json", {}).get("current_location_name"):
+        if not (saved.get("location_json") or _EMPTY).get("current_location_name"):
             # Reverse geocode to get location name
             location_name = reverse_geocode(current_latitude, current_longitude)
             
@@ -868,16 +1049,19 @@ def run_graph_chat_flow(
             
             print(f"📍 Using GPS-provided location: {location_name or 'coordinates'}")
     
-    # Create the graph
-    graph = create_chat_graph()
+    # Shared compiled graph
+    graph = get_chat_graph()
     
     # Determine where to start based on what we already have
     start_node = determine_start_node(initial_state)
     
-    print(f"🔍 DEBUG: start_node = {start_node}")
-    print(f"🔍 DEBUG: initial_state symptoms = {initial_state.get('symptoms')}")
-    print(f"🔍 DEBUG: initial_state diagnosis = {initial_state.get('diagnosis')}")
-    print(f"🔍 DEBUG: initial_state exposure = {initial_state.get('exposure_location_name')}")
+    logger.debug(
+        "🔍 start_node=%s symptoms=%s diagnosis=%s exposure=%s",
+        start_node,
+        initial_state.get("symptoms"),
+        initial_state.get("diagnosis"),
+        initial_state.get("exposure_location_name"),
+    )
     
     try:
         config = {
@@ -887,102 +1071,12 @@ def run_graph_chat_flow(
         
         # If resuming mid-flow, start at the appropriate node
         if start_node != "symptom_collection":
-            # Manually run the determined start node
+            # Manually run the determined start node, then follow the routers
+            # until one of them says to wait for the user
             current_state = dict(initial_state)
             
-            # Map of node names to functions
-            node_map = {
-                "diagnosis": diagnosis_node,
-                "exposure_collection": exposure_collection_node,
-                "location_collection": location_collection_node,
-                "bq_submission": bq_submission_node,
-                "cluster_validation": cluster_validation_node,
-                "care_advice": care_advice_node
-            }
-            
-            # Execute the determined start node
-            if start_node in node_map:
-                node_func = node_map[start_node]
-                updates = node_func(current_state)
-                current_state.update(updates)
-                
-                # CRITICAL FIX: Check if we just completed diagnosis and should auto-continue
-                if start_node == "diagnosis":
-                    next_route = route_after_diagnosis(current_state)
-                    if next_route == "exposure_collection":
-                        
-                        # Save the diagnosis output before calling exposure node
-                        diagnosis_output = current_state.get("console_output", "")
-                        
-                        # Call exposure node
-                        updates = exposure_collection_node(current_state)
-                        current_state.update(updates)
-                        
-                        # Combine both outputs so user sees diagnosis + exposure question
-                        exposure_output = current_state.get("console_output", "")
-                        if diagnosis_output and exposure_output:
-                            current_state["console_output"] = f"{diagnosis_output}\n\n{exposure_output}"
-                        elif diagnosis_output:
-                            current_state["console_output"] = diagnosis_output
-                        elif exposure_output:
-                            current_state["console_output"] = exposure_output
-                
-                # Check if we should auto-continue based on routers
-                # IMPORTANT: Only auto-continue if we're RESUMING (have exposure data already)
-                if start_node == "exposure_collection":
-                    # Check if exposure is complete and should continue to location
-                    next_route = route_after_exposure(current_state)
-                    
-                    # Only auto-continue if we HAVE exposure data (resuming mid-flow)
-                    has_exposure = (
-                        current_state.get("exposure_location_name") and 
-                        current_state.get("days_since_exposure") is not None
-                    )
-                    
-                    if has_exposure and next_route == "location_collection":
-                        updates = location_collection_node(current_state)
-                        current_state.update(updates)
-                        
-                        # Check if location is also complete
-                        next_route = route_after_location(current_state)
-                        if next_route == "cluster_validation":
-                            updates = cluster_validation_node(current_state)
-                            current_state.update(updates)
-                            
-                            # Auto-continue to BQ submission
-                            updates = bq_submission_node(current_state)
-                            current_state.update(updates)
-
-                            updates = care_advice_node(current_state)
-                            current_state.update(updates)
-                    
-                    # NEW: Handle GPS skip to cluster validation (only if we have exposure)
-                    elif has_exposure and next_route == "cluster_validation":
-                        updates = cluster_validation_node(current_state)
-                        current_state.update(updates)
-                        
-                        # Auto-continue to BQ submission
-                        updates = bq_submission_node(current_state)
-                        current_state.update(updates)
-
-                        updates = care_advice_node(current_state)
-                        current_state.update(updates)
-                
-                elif start_node == "location_collection":
-                    # Check if location is complete
-                    next_route = route_after_location(current_state)
-                    if next_route == "cluster_validation":
-                        updates = cluster_validation_node(current_state)
-                        current_state.update(updates)
-                        
-                        # Auto-continue to BQ submission
-                        updates = bq_submission_node(current_state)
-                        current_state.update(updates)
-
-                        updates = care_advice_node(current_state)
-                        current_state.update(updates)
-                
-                final_state = current_state
+            if start_node in _RESUME_FLOW:
+                final_state = _run_resume_flow(start_node, current_state)
 
             else:
                 # Shouldn't happen, but fallback to normal flow
@@ -992,39 +1086,20 @@ def run_graph_chat_flow(
             final_state = graph.invoke(initial_state, config)
         
         # Extract results - only send diagnosis/care_advice/report if newly generated
-        newly_diagnosed = (
-            final_state.get("diagnosis") and 
-            initial_state.get("diagnosis", {}).get("final_diagnosis") != final_state.get("diagnosis", {}).get("final_diagnosis")
-        )
-
-        # Also check if diagnosis was cluster-validated (confidence boost)
-        cluster_validated = (
-            final_state.get("diagnosis", {}).get("cluster_validated") == True and
-            not initial_state.get("diagnosis", {}).get("cluster_validated")
+        final_diagnosis = final_state.get("diagnosis")
+        before = initial_state.get("diagnosis") or _EMPTY
+        after = final_diagnosis or _EMPTY
+        # A new final diagnosis, or a newly cluster-validated one (confidence boost)
+        send_diagnosis = bool(final_diagnosis) and (
+            before.get("final_diagnosis") != after.get("final_diagnosis")
+            or (after.get("cluster_validated") == True and not before.get("cluster_validated"))
         )
 
-        newly_care_advice = (
-            final_state.get("care_advice") and
-            not initial_state.get("care_advice")
-        )
-
-        newly_report = (
-            final_state.get("report") and
-            not initial_state.get("report")
-        )
-
-        newly_cluster_validation = (
-            final_state.get("cluster_validation") and
-            not initial_state.get("cluster_validation")
-        )
-
-        result = {
-            "diagnosis": final_state.get("diagnosis") if (newly_diagnosed or cluster_validated) else None,
-            "care_advice": final_state.get("care_advice") if newly_care_advice else None,
-            "report": final_state.get("report") if newly_report else None,
-            "cluster_validation": final_state.get("cluster_validation") if newly_cluster_validation else None,
-            "console_output": final_state.get("console_output", "")
-        }
+        result = {"diagnosis": final_diagnosis if send_diagnosis else None}
+        for key in _NEW_OUTPUT_KEYS:
+            value = final_state.get(key)
+            result[key] = value if value and not initial_state.get(key) else None
+        result["console_output"] = final_state.get("console_output", "")
         
         # Prepare state to save
         state_to_save = {
@@ -1046,7 +1121,8 @@ def run_graph_chat_flow(
             "location_json": final_state.get("location_json"),
             "report": final_state.get("report"),
             "cluster_validation": final_state.get("cluster_validation", {}),
-            "care_advice": final_state.get("care_advice")
+            "care_advice": final_state.get("care_advice"),
+            "report_number": final_state.get("report_number", 0)
         }
 
         save_session_history(session_id, {
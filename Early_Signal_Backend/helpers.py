@@ -2,20 +2,32 @@
 """
 Shared helper functions for all agents and the orchestrator.
 """
-import json
+import orjson
 import re
 import sys
-from google import genai
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from google.genai import types
-from config import PROJECT_ID, LOCATION, MODEL
+from google.genai import errors as genai_errors
+import config
+from config import MODEL
 from datetime import datetime, timedelta
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Markdown fence stripper ---
+_FENCE_OPEN_RE = re.compile(r"^```(?:json)?\s*")
+_FENCE_CLOSE_RE = re.compile(r"\s*```$")
+
+
 def strip_fences(text: str) -> str:
     text = text.strip()
-    text = re.sub(r"^```(?:json)?\s*", "", text)
-    text = re.sub(r"\s*```$", "", text)
+    text = _FENCE_OPEN_RE.sub("", text)
+    text = _FENCE_CLOSE_RE.sub("", text)
     return text.strip()
 
 # --- Chat history serialization helpers ---
@@ -44,46 +56,218 @@ def deserialize_history(history: list) -> list:
             result.append(types.Content(role=msg["role"], parts=[types.Part.from_text(text=msg["content"])]))
     return result
 
+# --- Gemini context cache for static system prompts ---
+_PROMPT_CACHE_TTL_SECONDS = 3600
+_prompt_caches = {}  # sha1(system_prompt) -> (cached content name or None, refresh deadline)
+_prompt_caches_lock = threading.Lock()
+_prompt_create_locks = {}  # sha1(system_prompt) -> lock held while its cache is being created
+
+
+def _prompt_key(system_prompt: str) -> str:
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()
+
+
+def _get_cached_system_prompt(client, system_prompt: str):
+    """
+    Return the name of a server-side cached content holding this system prompt,
+    creating it on first use. Returns None when caching isn't available (e.g. the
+    prompt is below the model's minimum cacheable size); we then send it inline.
+    """
+    key = _prompt_key(system_prompt)
+    with _prompt_caches_lock:
+        entry = _prompt_caches.get(key)
+        create_lock = _prompt_create_locks.setdefault(key, threading.Lock())
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+
+    # One create per prompt: concurrent first calls wait for it instead of each
+    # uploading their own copy of the same prefix
+    with create_lock:
+        with _prompt_caches_lock:
+            entry = _prompt_caches.get(key)
+        now = time.monotonic()
+        if entry and entry[1] > now:
+            return entry[0]
+        return _create_cached_system_prompt(client, system_prompt, key, now)
+
+
+def _create_cached_system_prompt(client, system_prompt: str, key: str, now: float):
+    try:
+        cache = client.caches.create(
+            model=MODEL,
+            config=types.CreateCachedContentConfig(
+                system_instruction=types.Content(parts=[types.Part.from_text(text=system_prompt)]),
+                ttl=f"{_PROMPT_CACHE_TTL_SECONDS}s",
+                display_name=f"system-prompt-{key[:12]}",
+            ),
+        )
+        name = cache.name
+        print(f"🗄️ Cached system prompt {key[:12]} as {name}")
+    except Exception as e:
+        print(f"⚠️ Prompt cache unavailable, sending system prompt inline: {e}")
+        name = None
+
+    # Refresh a minute before the server-side TTL runs out
+    with _prompt_caches_lock:
+        _prompt_caches[key] = (name, now + _PROMPT_CACHE_TTL_SECONDS - 60)
+    return name
+
+
+def _drop_cached_system_prompt(system_prompt: str):
+    with _prompt_caches_lock:
+        _prompt_caches.pop(_prompt_key(system_prompt), None)
+
+
+def _is_missing_cache_error(e: Exception) -> bool:
+    """True if the call failed because the cached content expired or was evicted server-side."""
+    if not isinstance(e, genai_errors.ClientError):
+        return False
+    message = str(e).lower()
+    return e.code == 404 or ("cache" in message and ("not found" in message or "expired" in message))
+
+
 # --- Gemini chat generate ---
+_SAFETY_SETTINGS = [
+    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
+    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
+    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_LOW_AND_ABOVE"),
+]
+
+
+def _generate_text(client, history: list, cfg) -> str:
+    # Callers only use the finished text, so a single non-streaming call is enough
+    return client.models.generate_content(model=MODEL, contents=history, config=cfg).text
+
+
 def generate(user_message: str, history: list, system_prompt: str):
-    client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
-    # Apply custom system prompt
-    custom = system_prompt
+    client = config.genai_client
     # Append user message
     if user_message:
         history.append(
             types.Content(role="user", parts=[types.Part.from_text(text=user_message)])
         )
-    # Configure
-    cfg = types.GenerateContentConfig(
+    # The system prompt is a static prefix - serve it from the context cache when we can,
+    # so only the dynamic history is processed each turn
+    cache_name = _get_cached_system_prompt(client, system_prompt)
+    inline_cfg = types.GenerateContentConfig(
         temperature=0.2,
-        safety_settings=[
-            types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
-            types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
-            types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_LOW_AND_ABOVE"),
-        ],
+        safety_settings=_SAFETY_SETTINGS,
         response_mime_type="text/plain",
-        system_instruction=[types.Part.from_text(text=custom)]
+        system_instruction=[types.Part.from_text(text=system_prompt)]
     )
-    # Stream responses
-    resp_text = ""
-    for chunk in client.models.generate_content_stream(
-        model=MODEL, contents=history, config=cfg
-    ):
-        resp_text += chunk.text
+    if cache_name:
+        cfg = types.GenerateContentConfig(
+            temperature=0.2,
+            safety_settings=_SAFETY_SETTINGS,
+            response_mime_type="text/plain",
+            cached_content=cache_name
+        )
+        try:
+            resp_text = _generate_text(client, history, cfg)
+        except Exception as e:
+            # Only a missing cache is worth an inline retry; any other error would fail again
+            if not _is_missing_cache_error(e):
+                raise
+            print(f"⚠️ Cached prompt expired, retrying inline: {e}")
+            _drop_cached_system_prompt(system_prompt)
+            resp_text = _generate_text(client, history, inline_cfg)
+    else:
+        resp_text = _generate_text(client, history, inline_cfg)
     # Append model reply to history
     history.append(
         types.Content(role="model", parts=[types.Part.from_text(text=resp_text.strip())])
     )
     return resp_text.strip(), history
 
+# --- Cached generate for self-contained extraction prompts ---
+_RESPONSE_CACHE = OrderedDict()
+_RESPONSE_CACHE_MAX = 512
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_RESPONSE_INFLIGHT = {}  # cache key -> Future of the generate() call in progress
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _response_cache_key(user_message: str, system_prompt: str, branch: str) -> tuple:
+    prompt_hash = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()
+    return prompt_hash, branch, _WHITESPACE_RE.sub(" ", user_message).strip()
+
+
+def cached_generate(user_message: str, history: list, system_prompt: str, branch: str = ""):
+    """
+    Same contract as generate(), but reuses the reply for an identical
+    (system prompt, branch, prompt) triple. Only use this where the prompt
+    carries all the context the extraction needs, so history can't change the answer.
+    """
+    key = _response_cache_key(user_message, system_prompt, branch)
+    with _RESPONSE_CACHE_LOCK:
+        cached = _RESPONSE_CACHE.get(key)
+        if cached is not None:
+            _RESPONSE_CACHE.move_to_end(key)
+        else:
+            # Concurrent sessions asking the same thing share one model call
+            pending = _RESPONSE_INFLIGHT.get(key)
+            owner = pending is None
+            if owner:
+                pending = _RESPONSE_INFLIGHT[key] = Future()
+
+    if cached is None and owner:
+        try:
+            resp_text, history = generate(user_message, history, system_prompt)
+        except BaseException as e:
+            with _RESPONSE_CACHE_LOCK:
+                del _RESPONSE_INFLIGHT[key]
+            pending.set_exception(e)
+            raise
+        with _RESPONSE_CACHE_LOCK:
+            _RESPONSE_CACHE[key] = resp_text
+            if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+                _RESPONSE_CACHE.popitem(last=False)
+            del _RESPONSE_INFLIGHT[key]
+        pending.set_result(resp_text)
+        return resp_text, history
+
+    if cached is None:
+        cached = pending.result()
+        print("⚡ LLM call shared with a concurrent request")
+    else:
+        print("⚡ LLM cache hit")
+    # Keep the transcript shaped exactly as if the model had been called
+    if user_message:
+        history.append(
+            types.Content(role="user", parts=[types.Part.from_text(text=user_message)])
+        )
+    history.append(
+        types.Content(role="model", parts=[types.Part.from_text(text=cached)])
+    )
+    return cached, history
+
 # --- JSON extractor ---
 def extract_json(raw_text: str):
     clean = strip_fences(raw_text)
-    return json.loads(clean)
+    return orjson.loads(clean)
 
 # --- Date parser (compute days ago) ---
-import dateparser
+# dateparser is slow to import (locale tables, pytz), so it's loaded on the first
+# free-text date; its answers are remembered per (phrase, calendar day).
+_dateparser = None
+_DATEPARSE_CACHE = OrderedDict()
+_DATEPARSE_CACHE_MAX = 512
+_DATEPARSE_CACHE_LOCK = threading.Lock()
+_RELATIVE_QUALIFIER_RE = re.compile(r'\b(this past|last|the past|past)\b')
+_TIME_OF_DAY_RE = re.compile(r'\b(morning|afternoon|evening|night)\b')
+_N_UNITS_AGO_RE = re.compile(r'^(\d{1,4})\s+(day|days|week|weeks)\s+ago$')
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+_SIMPLE_OFFSETS = {"today": 0, "yesterday": 1}
+_DAYS_AGO_RE = re.compile(r'(\d+)\s*days?\s*(ago)?')
+
+
+def _days_between(year, month, day, today_ordinal):
+    """Whole days from (year, month, day) to today's ordinal, clamped at 0."""
+    try:
+        return max(today_ordinal - datetime(year, month, day).toordinal(), 0)
+    except ValueError:
+        return None
+
 
 def compute_days_ago(text_date, today=None):
     if not text_date or not isinstance(text_date, str):
@@ -99,48 +283,106 @@ def compute_days_ago(text_date, today=None):
         last_sunday = today - timedelta(days=today.weekday() + 1)
         return max((today - last_sunday).days, 0)
 
+    # Fast paths for the common shapes, so we only pay for dateparser on free text
+    if text_date in _SIMPLE_OFFSETS:
+        return _SIMPLE_OFFSETS[text_date]
+
+    match = _N_UNITS_AGO_RE.match(text_date)
+    if match:
+        n = int(match.group(1))
+        return n * 7 if match.group(2).startswith("week") else n
+
+    match = _ISO_DATE_RE.match(text_date)
+    if match:
+        days = _days_between(int(match.group(1)), int(match.group(2)), int(match.group(3)), today.toordinal())
+        if days is not None:
+            return days
+
     # Normalize phrasing
-    text_date = re.sub(r'\b(this past|last|the past|past)\b', '', text_date)
-    text_date = re.sub(r'\b(morning|afternoon|evening|night)\b', '', text_date)
+    text_date = _RELATIVE_QUALIFIER_RE.sub('', text_date)
+    text_date = _TIME_OF_DAY_RE.sub('', text_date)
+
+    days = _dateparser_days_ago(text_date, today)
+    if days is not None:
+        return days
+
+    print(f"⚠️ Could not parse date: {text_date}")
+    return None
+
+
+def _dateparser_days_ago(text_date, today):
+    """dateparser fallback for compute_days_ago, cached per (phrase, today's date)."""
+    global _dateparser
+    key = (text_date, today.date())
+    with _DATEPARSE_CACHE_LOCK:
+        if key in _DATEPARSE_CACHE:
+            _DATEPARSE_CACHE.move_to_end(key)
+            return _DATEPARSE_CACHE[key]
+
+    if _dateparser is None:
+        import dateparser as _dateparser
 
-    parsed = dateparser.parse(
+    parsed = _dateparser.parse(
         text_date,
         settings={
             'PREFER_DATES_FROM': 'past',
             'RELATIVE_BASE': today
         }
     )
+    days = max((today - parsed).days, 0) if parsed else None
 
-    if parsed:
-        return max((today - parsed).days, 0)
+    with _DATEPARSE_CACHE_LOCK:
+        _DATEPARSE_CACHE[key] = days
+        if len(_DATEPARSE_CACHE) > _DATEPARSE_CACHE_MAX:
+            _DATEPARSE_CACHE.popitem(last=False)
+    return days
 
-    print(f"⚠️ Could not parse date: {text_date}")
+
+def extract_days_directly(text: str) -> int:
+    """
+    Directly parse timing from user input without LLM.
+    Returns number of days or None if not found.
+    """
+    text_lower = text.strip().lower()
+    
+    # Match pure number (most common case when we ask "how many days ago?") - no regex needed
+    if text_lower.isdigit() and text_lower.isascii() and len(text_lower) <= 4:
+        return int(text_lower)
+    
+    # Match "X days" or "X days ago"
+    match = _DAYS_AGO_RE.search(text_lower)
+    if match:
+        return int(match.group(1))
+    
+    # Match "yesterday"
+    if 'yesterday' in text_lower:
+        return 1
+    
+    # Match "today"
+    if 'today' in text_lower:
+        return 0
+    
+    # Match "last week" or "a week ago"
+    if 'last week' in text_lower or 'a week ago' in text_lower:
+        return 7
+    
     return None
 
+
 def determine_final_diagnosis(top_matches, clarification_answers):
-    evidence = {
-        "answers": clarification_answers,
-        "positive_keywords": ["yes", "y", "true", "present"],
-        "negative_keywords": ["no", "n", "false", "absent"]
-    }
-    scored_matches = []
-    for match in top_matches:
-        score = match["score"]
-        reasoning = []
-        if "fever" in match["id"].lower():
-            if any("fever" in ans.lower() for ans in clarification_answers):
-                score += 0.2
-                reasoning.append("Patient confirmed fever")
-        scored_matches.append({
-            "id": match["id"],
-            "final_score": min(1.0, score),
-            "reasoning": "; ".join(reasoning) if reasoning else "No additional evidence"
-        })
-    final_match = max(scored_matches, key=lambda x: x["final_score"])
+    # The answers don't depend on the candidate, so scan them once, not per match
+    fever_confirmed = any("fever" in ans.lower() for ans in clarification_answers)
+
+    def _score(match):
+        if fever_confirmed and "fever" in match["id"].lower():
+            return match["id"], min(1.0, match["score"] + 0.2), "Patient confirmed fever"
+        return match["id"], min(1.0, match["score"]), "No additional evidence"
+
+    final_id, final_score, reasoning = max(map(_score, top_matches), key=lambda m: m[1])
     return {
-        "diagnosis": final_match["id"],
-        "confidence": final_match["final_score"],
-        "reasoning": final_match["reasoning"] or f"Highest initial score ({final_match['final_score']})"
+        "diagnosis": final_id,
+        "confidence": final_score,
+        "reasoning": reasoning or f"Highest initial score ({final_score})"
     }
 
 def clean_location_string(location_string):
@@ -177,7 +419,69 @@ def clean_location_string(location_string):
     # Rejoin with commas
     return ', '.join(cleaned_parts)
 
+# --- Geocode cache ---
+# Popular venues recur across sessions; keep hits for a day, misses only briefly
+# so a transient API failure doesn't stick.
+_GEOCODE_CACHE = OrderedDict()
+_GEOCODE_CACHE_MAX = 4096
+_GEOCODE_HIT_TTL_SECONDS = 24 * 3600
+_GEOCODE_MISS_TTL_SECONDS = 600
+_GEOCODE_CACHE_LOCK = threading.Lock()
+
+# One keep-alive HTTP session for the Places and Nominatim lookups, so a cache miss
+# doesn't pay a fresh TCP + TLS handshake. Connect errors get two quick retries.
+_GEO_SESSION = requests.Session()
+_GEO_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+_GMAPS_CLIENTS = {}  # api key -> googlemaps.Client (each holds its own keep-alive session)
+
+
+def _get_gmaps_client(api_key):
+    client = _GMAPS_CLIENTS.get(api_key)
+    if client is None:
+        import googlemaps
+        client = _GMAPS_CLIENTS[api_key] = googlemaps.Client(key=api_key)
+    return client
+
+
+def _geocode_cache_key(location_name, bias_lat, bias_lon):
+    name = _WHITESPACE_RE.sub(" ", location_name).strip().lower()
+    # ~1km of GPS bias resolution is plenty for choosing between same-name venues
+    bias = (round(bias_lat, 2), round(bias_lon, 2)) if bias_lat and bias_lon else None
+    return name, bias
+
+
 def geocode_location(location_name, bias_lat=None, bias_lon=None):
+    """
+    Cached front for _geocode_location_uncached(); same arguments and return value.
+    """
+    if not location_name:
+        return None, None
+
+    key = _geocode_cache_key(location_name, bias_lat, bias_lon)
+    now = time.monotonic()
+    with _GEOCODE_CACHE_LOCK:
+        entry = _GEOCODE_CACHE.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                _GEOCODE_CACHE.move_to_end(key)
+                print(f"[Geocoding] ⚡ Cache hit: '{location_name}'")
+                return entry[0]
+            del _GEOCODE_CACHE[key]
+
+    coords = _geocode_location_uncached(location_name, bias_lat, bias_lon)
+    ttl = _GEOCODE_HIT_TTL_SECONDS if coords[0] is not None else _GEOCODE_MISS_TTL_SECONDS
+    with _GEOCODE_CACHE_LOCK:
+        _GEOCODE_CACHE[key] = (coords, now + ttl)
+        _GEOCODE_CACHE.move_to_end(key)
+        if len(_GEOCODE_CACHE) > _GEOCODE_CACHE_MAX:
+            _GEOCODE_CACHE.popitem(last=False)
+    return coords
+
+
+def _geocode_location_uncached(location_name, bias_lat=None, bias_lon=None):
     """
     Convert location name to lat/lon using Google Maps APIs.
     
@@ -195,7 +499,6 @@ def geocode_location(location_name, bias_lat=None, bias_lon=None):
         (latitude, longitude) or (None, None) if not found
     """
     import os
-    import requests
     from math import radians, sin, cos, sqrt, atan2
     
     def calculate_distance(lat1, lon1, lat2, lon2):
@@ -255,7 +558,7 @@ def geocode_location(location_name, bias_lat=None, bias_lon=None):
                     }
                 }
             
-            response = requests.post(url, headers=headers, json=body, timeout=5)
+            response = _GEO_SESSION.post(url, headers=headers, json=body, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -303,8 +606,7 @@ def geocode_location(location_name, bias_lat=None, bias_lon=None):
         try:
             print(f"[Geocoding]   Strategy 2: Trying Geocoding API...")
             
-            import googlemaps
-            gmaps = googlemaps.Client(key=api_key)
+            gmaps = _get_gmaps_client(api_key)
             
             # Build geocode params
             params = {}
@@ -358,15 +660,17 @@ def geocode_location(location_name, bias_lat=None, bias_lon=None):
 
 def parse_json_from_response(text):
     try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        return json.loads(match.group()) if match else None
+        # Outermost braces (same span as a greedy {.*} match), found without regex
+        start = text.find("{")
+        end = text.rfind("}")
+        return orjson.loads(text[start:end + 1]) if start != -1 and end > start else None
     except Exception as e:
         print("❌ Failed to parse JSON:", e)
         return None
 
 def fix_json(response: str) -> dict:
     try:
-        return json.loads(response.strip("`").replace("'", '"'))
+        return orjson.loads(response.strip("`").replace("'", '"'))
     except:
         return {"text": response, "error": "auto_fixed"}
 
@@ -403,7 +707,40 @@ def normalize_agent_response(raw_response: str, response_type: str) -> dict:
         print(f"⚠️ Normalization error ({response_type}): {str(e)}")
         return {"error": f"Failed to normalize {response_type} response"}
 
+# --- Reverse geocode cache ---
+# Keyed by a ~11m grid cell (4 decimal places), about the accuracy of a phone GPS fix,
+# so repeat coordinates skip Nominatim without naming the wrong street.
+_REVERSE_GEOCODE_CACHE = OrderedDict()
+_REVERSE_GEOCODE_CACHE_MAX = 4096
+_REVERSE_GEOCODE_CACHE_LOCK = threading.Lock()
+
+
 def reverse_geocode(latitude: float, longitude: float) -> str:
+    """
+    Cached front for _reverse_geocode_uncached(); same arguments and return value.
+    """
+    key = (round(latitude, 4), round(longitude, 4))
+    now = time.monotonic()
+    with _REVERSE_GEOCODE_CACHE_LOCK:
+        entry = _REVERSE_GEOCODE_CACHE.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                _REVERSE_GEOCODE_CACHE.move_to_end(key)
+                print(f"🗺️ ⚡ Reverse geocode cache hit ({latitude}, {longitude}) → {entry[0]}")
+                return entry[0]
+            del _REVERSE_GEOCODE_CACHE[key]
+
+    location_str = _reverse_geocode_uncached(latitude, longitude)
+    ttl = _GEOCODE_HIT_TTL_SECONDS if location_str else _GEOCODE_MISS_TTL_SECONDS
+    with _REVERSE_GEOCODE_CACHE_LOCK:
+        _REVERSE_GEOCODE_CACHE[key] = (location_str, now + ttl)
+        _REVERSE_GEOCODE_CACHE.move_to_end(key)
+        if len(_REVERSE_GEOCODE_CACHE) > _REVERSE_GEOCODE_CACHE_MAX:
+            _REVERSE_GEOCODE_CACHE.popitem(last=False)
+    return location_str
+
+
+def _reverse_geocode_uncached(latitude: float, longitude: float) -> str:
     """
     Convert lat/lon coordinates to a human-readable location name.
     Uses OpenStreetMap Nominatim reverse geocoding API.
@@ -416,7 +753,7 @@ def reverse_geocode(latitude: float, longitude: float) -> str:
         Location string like "123 Main St, Chicago, IL" or None if failed
     """
     try:
-        response = requests.get(
+        response = _GEO_SESSION.get(
             "https://nominatim.openstreetmap.org/reverse",
             params={
                 "lat": latitude,
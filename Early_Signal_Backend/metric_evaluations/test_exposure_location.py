@@ -388,8 +388,7 @@ def run_single_test(test_case: Dict) -> Dict:
     
     try:
         # Call exposure agent
-        result_json, _ = run_exposure_agent(json.dumps(payload), [])
-        result = json.loads(result_json)
+        result, _ = run_exposure_agent(json.dumps(payload), [])
         
         # Extract location data
         extracted_location = result.get("exposure_location_name")
@@ -395,8 +395,7 @@ def run_single_test(test_case: Dict) -> Dict:
     
     try:
         # Call cluster validation agent directly
-        result_json, _ = run_cluster_validation(json.dumps(payload), [])
-        result = json.loads(result_json)
+        result, _ = run_cluster_validation(json.dumps(payload), [])
         
         cluster_found = result.get("cluster_found", False)
         validation_result = result.get("validation_result")
@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import googlemaps
 
 # Get API key
@@ -11,93 +12,44 @@ gmaps = googlemaps.Client(key=api_key)
 # User's GPS location (Chicago)
 user_lat = 41.8922417
 user_lon = -87.6179083
-
-print("\n" + "="*70)
-print("TEST 1: Simple query (no bounds)")
-print("="*70)
-
-try:
-    result1 = gmaps.geocode("McDonald's")
-    if result1:
-        print(f"✅ Found: {result1[0]['formatted_address']}")
-        print(f"   Types: {result1[0]['types']}")
-    else:
-        print("❌ No results")
-except Exception as e:
-    print(f"❌ Error: {e}")
-
-print("\n" + "="*70)
-print("TEST 2: With typo (Mc donalds)")
-print("="*70)
-
-try:
-    result2 = gmaps.geocode("Mc donalds")
-    if result2:
-        print(f"✅ Found: {result2[0]['formatted_address']}")
-        print(f"   Types: {result2[0]['types']}")
-    else:
-        print("❌ No results")
-except Exception as e:
-    print(f"❌ Error: {e}")
-
-print("\n" + "="*70)
-print("TEST 3: With GPS bounds")
-print("="*70)
-
-try:
-    result3 = gmaps.geocode(
-        "Mc donalds",
-        bounds={
-            'southwest': {'lat': user_lat - 0.2, 'lng': user_lon - 0.2},
-            'northeast': {'lat': user_lat + 0.2, 'lng': user_lon + 0.2}
-        }
-    )
-    if result3:
-        print(f"✅ Found: {result3[0]['formatted_address']}")
-        print(f"   Types: {result3[0]['types']}")
-        print(f"   Location: {result3[0]['geometry']['location']}")
-    else:
-        print("❌ No results")
-except Exception as e:
-    print(f"❌ Error: {e}")
-
-print("\n" + "="*70)
-print("TEST 4: With region parameter")
-print("="*70)
-
-try:
-    result4 = gmaps.geocode(
-        "Mc donalds",
-        region='us',
-        bounds={
-            'southwest': {'lat': user_lat - 0.2, 'lng': user_lon - 0.2},
-            'northeast': {'lat': user_lat + 0.2, 'lng': user_lon + 0.2}
-        }
-    )
-    if result4:
-        print(f"✅ Found: {result4[0]['formatted_address']}")
-        print(f"   Types: {result4[0]['types']}")
-    else:
-        print("❌ No results")
-except Exception as e:
-    print(f"❌ Error: {e}")
-
-print("\n" + "="*70)
-print("TEST 5: Just 'McDonald' (no 's')")
-print("="*70)
-
-try:
-    result5 = gmaps.geocode(
-        "McDonald",
-        bounds={
-            'southwest': {'lat': user_lat - 0.2, 'lng': user_lon - 0.2},
-            'northeast': {'lat': user_lat + 0.2, 'lng': user_lon + 0.2}
-        }
-    )
-    if result5:
-        print(f"✅ Found: {result5[0]['formatted_address']}")
-        print(f"   Types: {result5[0]['types']}")
+BOUNDS = {
+    'southwest': {'lat': user_lat - 0.2, 'lng': user_lon - 0.2},
+    'northeast': {'lat': user_lat + 0.2, 'lng': user_lon + 0.2}
+}
+
+# (title, query, extra geocode kwargs, show location)
+TESTS = [
+    ("TEST 1: Simple query (no bounds)", "McDonald's", {}, False),
+    ("TEST 2: With typo (Mc donalds)", "Mc donalds", {}, False),
+    ("TEST 3: With GPS bounds", "Mc donalds", {'bounds': BOUNDS}, True),
+    ("TEST 4: With region parameter", "Mc donalds", {'region': 'us', 'bounds': BOUNDS}, False),
+    ("TEST 5: Just 'McDonald' (no 's')", "McDonald", {'bounds': BOUNDS}, False),
+]
+
+
+def run_test(query, kwargs):
+    try:
+        return gmaps.geocode(query, **kwargs), None
+    except Exception as e:
+        return None, e
+
+
+# The lookups are independent, so issue them together; print in test order afterwards
+with ThreadPoolExecutor(max_workers=len(TESTS)) as pool:
+    futures = [pool.submit(run_test, query, kwargs) for _, query, kwargs, _ in TESTS]
+
+for (title, _, _, show_location), future in zip(TESTS, futures):
+    print("\n" + "="*70)
+    print(title)
+    print("="*70)
+
+    result, error = future.result()
+    if error is not None:
+        print(f"❌ Error: {error}")
+    elif result:
+        print(f"✅ Found: {result[0]['formatted_address']}")
+        print(f"   Types: {result[0]['types']}")
+        if show_location:
+            print(f"   Location: {result[0]['geometry']['location']}")
     else:
         print("❌ No results")
-except Exception as e:
-    print(f"❌ Error: {e}")
@@ -1,6 +1,7 @@
 # test_cluster_validation.py
 
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from agents.cluster_validation_agent import run_agent
 
 def test_with_real_outbreak_data():
@@ -193,16 +194,7 @@ def test_with_real_outbreak_data():
     print("   4. E. coli @ Oak Street Beach, Chicago (7 cases)")
     print("=" * 80)
     
-    passed = 0
-    failed = 0
-    no_data = 0
-    
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n{'='*80}")
-        print(f"Test {i}: {test_case['name']}")
-        print(f"{'='*80}")
-        print(f"📝 {test_case['description']}")
-        
+    def run_case(test_case):
         payload = {
             "user_disease": test_case["user_disease"],
             "user_confidence": test_case["user_confidence"],
@@ -211,6 +203,22 @@ def test_with_real_outbreak_data():
             "days_since_exposure": test_case["days_since_exposure"],
             "illness_category": test_case["illness_category"]
         }
+        result, _ = run_agent(orjson.dumps(payload).decode(), [])
+        return result
+    
+    # Each case is an independent BigQuery lookup, so run them together and report in order
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(run_case, test_cases))
+    
+    passed = 0
+    failed = 0
+    no_data = 0
+    
+    for i, (test_case, result) in enumerate(zip(test_cases, results), 1):
+        print(f"\n{'='*80}")
+        print(f"Test {i}: {test_case['name']}")
+        print(f"{'='*80}")
+        print(f"📝 {test_case['description']}")
         
         print(f"\n📋 Input:")
         print(f"   Disease: {test_case['user_disease']} ({test_case['user_confidence']:.0%} confidence)")
@@ -218,9 +226,6 @@ def test_with_real_outbreak_data():
         print(f"   Exposure: {test_case['days_since_exposure']} days ago")
         print(f"   Expected: {test_case['expected_result']}")
         
-        result_json, _ = run_agent(json.dumps(payload), [])
-        result = json.loads(result_json)
-        
         cluster_found = result["cluster_found"]
         validation_result = result["validation_result"]
         expected = test_case["expected_result"]
@@ -334,8 +339,7 @@ def test_edge_cases():
     # Test 1: Missing required fields
     print("\n1. Missing required fields:")
     payload = {"user_disease": "Influenza"}  # Missing coordinates
-    result_json, _ = run_agent(json.dumps(payload), [])
-    result = json.loads(result_json)
+    result, _ = run_agent(orjson.dumps(payload).decode(), [])
     
     if "error" in result:
         print("   ✅ Correctly returned error for missing fields")
@@ -352,8 +356,7 @@ def test_edge_cases():
         "days_since_exposure": 2,
         "illness_category": "foodborne"
     }
-    result_json, _ = run_agent(json.dumps(payload), [])
-    result = json.loads(result_json)
+    result, _ = run_agent(orjson.dumps(payload).decode(), [])
     
     if not result["cluster_found"]:
         print("   ✅ Correctly returned no cluster for invalid location")
@@ -370,8 +373,7 @@ def test_edge_cases():
         "days_since_exposure": 60,
         "illness_category": "insect-borne"
     }
-    result_json, _ = run_agent(json.dumps(payload), [])
-    result = json.loads(result_json)
+    result, _ = run_agent(orjson.dumps(payload).decode(), [])
     
     print(f"   Result: {result['validation_result']}")
     print("   ✅ Old exposures handled correctly")
@@ -386,8 +388,7 @@ def test_edge_cases():
         "days_since_exposure": -5,  # Invalid
         "illness_category": "airborne"
     }
-    result_json, _ = run_agent(json.dumps(payload), [])
-    result = json.loads(result_json)
+    result, _ = run_agent(orjson.dumps(payload).decode(), [])
     
     print(f"   Handled gracefully: {result['validation_result']}")
     
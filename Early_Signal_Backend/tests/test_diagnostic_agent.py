@@ -21,7 +21,7 @@ def test_diagnostic_agent():
         "clarifier_context": []
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     print(f"Is asking question: {result_data.get('awaiting_field') == 'clarifier_answer'}")
     
@@ -39,7 +39,7 @@ def test_diagnostic_agent():
         ]
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     print(f"Has final diagnosis: {'final_diagnosis' in result_data}")
     if 'final_diagnosis' in result_data:
@@ -61,7 +61,7 @@ def test_diagnostic_agent():
         ]
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     if 'final_diagnosis' in result_data:
         print(f"Category should be waterborne: {result_data['illness_category']}")
@@ -75,7 +75,7 @@ def test_diagnostic_agent():
         "clarifier_context": []
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     
     # Test 5: Force final diagnosis (max clarifications reached)
@@ -92,7 +92,7 @@ def test_diagnostic_agent():
         "force_final_diagnosis": True
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     print(f"MUST have final diagnosis: {'final_diagnosis' in result_data}")
     
@@ -105,7 +105,7 @@ def test_diagnostic_agent():
         "clarifier_context": []
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     if result_data.get('awaiting_field') == 'clarifier_answer':
         question = result_data.get('console_output', '').lower()
@@ -122,7 +122,7 @@ def test_diagnostic_agent():
         "clarifier_context": []
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Step 1: {result_data.get('console_output', 'Got diagnosis')}")
     
     if result_data.get('awaiting_field') == 'clarifier_answer':
@@ -139,7 +139,7 @@ def test_diagnostic_agent():
             "clarifier_context": clarifier_context
         }
         result, history = run_agent(json.dumps(payload), history)
-        result_data = json.loads(result)
+        result_data = result
         print(f"Step 2: {result_data.get('console_output', result_data.get('final_diagnosis'))}")
         
         if result_data.get('awaiting_field') == 'clarifier_answer':
@@ -154,7 +154,7 @@ def test_diagnostic_agent():
                 "clarifier_context": clarifier_context
             }
             result, history = run_agent(json.dumps(payload), history)
-            result_data = json.loads(result)
+            result_data = result
             print(f"Step 3 (should be diagnosis): {json.dumps(result_data, indent=2)}")
     
     # Test 8: Insufficient data
@@ -166,7 +166,7 @@ def test_diagnostic_agent():
         "clarifier_context": []
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     
     # Test 9: Force diagnosis with minimal info (fallback scenario)
@@ -179,7 +179,7 @@ def test_diagnostic_agent():
         "force_final_diagnosis": True
     }
     result, history = run_agent(json.dumps(payload), history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"Agent Response: {json.dumps(result_data, indent=2)}")
     print(f"Should have fallback diagnosis: {'final_diagnosis' in result_data}")
     
@@ -1,7 +1,7 @@
 # test_exposure_agent.py
 
 import json
-from agents.exposure_agent import run_agent
+from agents.exposure_agent import run_agent, venue_from_reply
 
 def test_exposure_agent():
     """Test the exposure agent with various inputs"""
@@ -22,7 +22,7 @@ def test_exposure_agent():
         "days_since_exposure": 2
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 2: User provides complete information
     print("\n[TEST 2] User provides location AND days")
@@ -32,7 +32,7 @@ def test_exposure_agent():
         "user_input": "I ate at Chipotle on Michigan Avenue 3 days ago"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 3: User provides only location
     print("\n[TEST 3] User provides only location")
@@ -43,17 +43,17 @@ def test_exposure_agent():
         "user_input": "I ate at Whole Foods in Lincoln Park"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 4: Follow-up with days (using partial_location from previous response)
     print("\n[TEST 4] Follow-up: User provides days")
-    prev_result = json.loads(result)
+    prev_result = result
     payload = {
         "user_input": "5 days ago",
         "partial_location": prev_result.get("partial_location")
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 5: User provides only days
     print("\n[TEST 5] User provides only days")
@@ -64,7 +64,7 @@ def test_exposure_agent():
         "user_input": "4 days ago"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 6: Invalid answer (I don't know)
     print("\n[TEST 6] User says 'I don't know'")
@@ -75,7 +75,7 @@ def test_exposure_agent():
         "user_input": "I don't know"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 7: Natural language with filler
     print("\n[TEST 7] Natural language with filler words")
@@ -86,12 +86,44 @@ def test_exposure_agent():
         "user_input": "I ate at this restaurant called Lou Malnati's in Chicago about 2 days ago"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     print("\n" + "=" * 70)
     print("TESTS COMPLETE")
     print("=" * 70)
 
 
+def test_venue_from_reply():
+    """Bare venue names skip the LLM; hedges and non-answers must not"""
+    print("\n[TEST] venue_from_reply fast path")
+    venues = {
+        "I was at Whole Foods Market": "Whole Foods Market",
+        "at Lou Malnati's Pizzeria.": "Lou Malnati's Pizzeria",
+        "Navy Pier Ferris Wheel": "Navy Pier Ferris Wheel",
+        "the pool": "pool",
+        "taco truck": "taco truck",
+    }
+    for reply, expected in venues.items():
+        got = venue_from_reply(reply)
+        print(f"  {reply!r} -> {got!r}")
+        assert got == expected, f"{reply!r}: expected {expected!r}, got {got!r}"
+
+    non_venues = [
+        "I can't remember", "I forgot", "Forgot", "I don't remember", "don't know",
+        "Not sure", "no idea", "Can't recall", "Who knows", "dunno", "somewhere downtown",
+        "Chipotle 3 days ago", "restaurant", "yes", "where?", "chipotle",
+        # A leading capital alone is just the keyboard, not a proper noun
+        "Chipotle", "Whole Foods", "Nope", "None", "Nothing", "Nah", "Hmm", "Everywhere",
+        "Same place", "Around town", "Earlier", "Ok", "Thanks", "Wait what", "Same as before",
+        "Pass", "Monday", "Last Friday", "This morning", "The same restaurant",
+    ]
+    for reply in non_venues:
+        got = venue_from_reply(reply)
+        print(f"  {reply!r} -> {got!r}")
+        assert got is None, f"{reply!r} should fall back to the LLM, got {got!r}"
+    print("✅ venue_from_reply")
+
+
 if __name__ == "__main__":
+    test_venue_from_reply()
     test_exposure_agent()
\ No newline at end of file
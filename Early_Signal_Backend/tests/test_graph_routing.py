@@ -8,8 +8,10 @@ from graph_orchestrator import (
     route_after_diagnosis,
     route_after_exposure,
     route_after_location,
-    determine_start_node
+    determine_start_node,
+    _run_resume_flow
 )
+import graph_orchestrator
 from firestore_session import get_session_history, save_session_history
 from langgraph.graph import END
 
@@ -471,10 +473,109 @@ def test_resume_from_each_stage():
     print("✓ PASS - Resumed at location stage")
 
 
+def test_clarifier_context_across_turns():
+    """Clarifier answers from consecutive resumed turns must all be kept"""
+    
+    print("\n" + "=" * 70)
+    print("CLARIFIER CONTEXT ACROSS TURNS TEST")
+    print("=" * 70)
+    
+    questions = iter(["Did you eat out recently?", "Any fever?", "Any vomiting?"])
+    
+    def fake_diagnostic(payload, history):
+        # Always ask another question so the flow stops back at END
+        question = next(questions)
+        return {"awaiting_field": "clarifier_answer", "console_output": question}, history
+    
+    state = {
+        "symptoms": ["nausea"],
+        "days_since_onset": 2,
+        "diagnosis": {"awaiting_field": "clarifier_answer", "console_output": "Any cramps?"},
+        "clarifier_context": [],
+        "clarification_attempts": 1,
+        "history": []
+    }
+    
+    real_diagnostic = graph_orchestrator.run_diagnostic
+    graph_orchestrator.run_diagnostic = fake_diagnostic
+    try:
+        for answer in ("yes, cramps", "yes, at a taco stand"):
+            state["user_input"] = answer
+            state = _run_resume_flow("diagnosis", state)
+    finally:
+        graph_orchestrator.run_diagnostic = real_diagnostic
+    
+    context = state.get("clarifier_context", [])
+    print(f"Clarifier context: {context}")
+    assert [qa["answer"] for qa in context] == ["yes, cramps", "yes, at a taco stand"], "Both answers should be kept"
+    assert [qa["question"] for qa in context] == ["Any cramps?", "Did you eat out recently?"]
+    print("✓ PASS - Both clarifier pairs kept")
+
+
+def test_new_report_after_finished_session():
+    """"new report" after a finished session must start from a fresh state"""
+    
+    print("\n" + "=" * 70)
+    print("NEW REPORT AFTER FINISHED SESSION TEST")
+    print("=" * 70)
+    
+    location_json = {"current_location_name": "Chicago, IL", "current_latitude": 41.88, "current_longitude": -87.63}
+    finished = {
+        "user_id": "user-123",
+        "symptoms": ["nausea"],
+        "days_since_onset": 2,
+        "diagnosis": {"final_diagnosis": "Food poisoning", "illness_category": "foodborne"},
+        "clarifier_context": [{"question": "Any cramps?", "answer": "yes"}],
+        "exposure_location_name": "Taco stand",
+        "days_since_exposure": 3,
+        "location_city_state": "Chicago, IL",
+        "location_venue": "Home",
+        "location_json": location_json,
+        "report": {"report_id": 1234},
+        "cluster_validation": {"matched": False},
+        "care_advice": {"advice": "Rest"},
+    }
+    saves = []
+    invoked = []
+    
+    class FakeGraph:
+        def invoke(self, state, config):
+            invoked.append(dict(state))
+            return {**state, "console_output": "What symptoms are you having?"}
+    
+    real = (graph_orchestrator.get_session_history, graph_orchestrator.save_session_history,
+            graph_orchestrator.get_chat_graph)
+    graph_orchestrator.get_session_history = lambda sid: {"history": [{"role": "user", "content": "old"}], "state": finished}
+    graph_orchestrator.save_session_history = lambda sid, data: saves.append(data)
+    graph_orchestrator.get_chat_graph = lambda: FakeGraph()
+    try:
+        result, _ = run_graph_chat_flow("new report", session_id="finished-session")
+    finally:
+        (graph_orchestrator.get_session_history, graph_orchestrator.save_session_history,
+         graph_orchestrator.get_chat_graph) = real
+    
+    assert result["console_output"] != "Your report is complete. Start a new report to log another illness."
+    assert len(invoked) == 1, "The graph should run from symptom collection"
+    state = invoked[0]
+    for key in ("symptoms", "diagnosis", "clarifier_context", "exposure_location_name", "days_since_exposure",
+                "report", "cluster_validation", "care_advice"):
+        assert not state.get(key), f"{key} should be reset, got {state.get(key)!r}"
+    assert state["history"] == [], "Old conversation should not carry into the new report"
+    assert state["report_number"] == 1, "A new report gets its own report_id"
+    assert state["user_id"] == "user-123"
+    assert state["location_json"] == location_json
+    assert saves and saves[0]["state"]["report_number"] == 1
+    print("✓ PASS - New report starts from a fresh state")
+
+
 if __name__ == "__main__":
     # Run all routing tests
     test_routing_logic()
     
+    test_clarifier_context_across_turns()
+    
+    test_new_report_after_finished_session()
+    
     # Run end-to-end flow test
     try:
         success = test_end_to_end_flow()
@@ -17,14 +17,14 @@ def test_location_agent():
     print("\n[TEST 1] Initial call (no prior data)")
     user_input = ""
     result, history = run_agent(user_input, history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 2: User provides city and state
     print("\n[TEST 2] User provides city and state")
     history = []  # Reset
     user_input = "Chicago, IL"
     result, history = run_agent(user_input, history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 3: Follow-up - ask for venue with city/state context
     print("\n[TEST 3] Follow-up asking for venue")
@@ -35,14 +35,14 @@ def test_location_agent():
         "city_state": "Chicago, IL"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 4: User provides full location in one response
     print("\n[TEST 4] User provides detailed location")
     history = []
     user_input = "New York City, New York"
     result, history = run_agent(user_input, history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"First response: {json.dumps(result_data, indent=2)}")
     
     # Then venue
@@ -53,7 +53,7 @@ def test_location_agent():
             "city_state": "New York City, New York"
         }
         result, history = run_agent(json.dumps(payload), history)
-        print(f"Second response: {json.dumps(json.loads(result), indent=2)}")
+        print(f"Second response: {json.dumps(result, indent=2)}")
     
     # Test 5: User provides neighborhood/area
     print("\n[TEST 5] User provides neighborhood")
@@ -64,7 +64,7 @@ def test_location_agent():
         "city_state": "Chicago, IL"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 6: User provides specific address
     print("\n[TEST 6] User provides specific address")
@@ -75,7 +75,7 @@ def test_location_agent():
         "city_state": "San Francisco, CA"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 7: User provides landmark
     print("\n[TEST 7] User provides landmark")
@@ -86,7 +86,7 @@ def test_location_agent():
         "city_state": "Chicago, IL"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 8: Vague location
     print("\n[TEST 8] User provides vague location")
@@ -97,7 +97,7 @@ def test_location_agent():
         "city_state": "Boston, MA"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 9: User says "I don't know"
     print("\n[TEST 9] User says 'I don't know' to venue")
@@ -108,14 +108,14 @@ def test_location_agent():
         "city_state": "Chicago, IL"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 10: International location
     print("\n[TEST 10] International location")
     history = []
     user_input = "Toronto, Ontario, Canada"
     result, history = run_agent(user_input, history)
-    result_data = json.loads(result)
+    result_data = result
     print(f"First response: {json.dumps(result_data, indent=2)}")
     
     if result_data.get("awaiting_field") == "venue":
@@ -125,14 +125,14 @@ def test_location_agent():
             "city_state": "Toronto, Ontario, Canada"
         }
         result, history = run_agent(json.dumps(payload), history)
-        print(f"Second response: {json.dumps(json.loads(result), indent=2)}")
+        print(f"Second response: {json.dumps(result, indent=2)}")
     
     # Test 11: Just state (no city)
     print("\n[TEST 11] User provides only state")
     history = []
     user_input = "Illinois"
     result, history = run_agent(user_input, history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 12: Multiple venues in response
     print("\n[TEST 12] User mentions multiple places")
@@ -143,7 +143,7 @@ def test_location_agent():
         "city_state": "Chicago, IL"
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     print("\n" + "=" * 70)
     print("TESTS COMPLETE")
@@ -21,7 +21,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 2: User provides complete information (symptoms + days)
     print("\n[TEST 2] User provides symptoms AND days together")
@@ -32,7 +32,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 3: Follow-up - user provides days after symptoms collected
     print("\n[TEST 3] Follow-up: User provides days (pure number)")
@@ -43,7 +43,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 4: Follow-up - user provides days (temporal phrase)
     print("\n[TEST 4] Follow-up: User provides days (yesterday)")
@@ -54,7 +54,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 5: Follow-up - user provides days (phrase)
     print("\n[TEST 5] Follow-up: User provides days (3 days ago)")
@@ -65,7 +65,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 6: User provides only timing
     print("\n[TEST 6] User provides only timing (no symptoms)")
@@ -76,7 +76,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 7: Follow-up - user provides symptoms after days collected
     print("\n[TEST 7] Follow-up: User provides symptoms (have days)")
@@ -87,7 +87,7 @@ def test_symptom_agent():
         "current_days": 4
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 8: User provides vague symptoms
     print("\n[TEST 8] User provides vague symptoms")
@@ -98,7 +98,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 9: Multiple symptoms
     print("\n[TEST 9] User provides multiple detailed symptoms")
@@ -109,7 +109,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 10: Edge case - pure number that could be symptom or days
     print("\n[TEST 10] Edge case: Pure number with existing symptoms")
@@ -120,7 +120,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 11: Last week
     print("\n[TEST 11] Temporal phrase: last week")
@@ -131,7 +131,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     # Test 12: Natural language with everything
     print("\n[TEST 12] Natural language with symptoms and timing")
@@ -142,7 +142,7 @@ def test_symptom_agent():
         "current_days": None
     }
     result, history = run_agent(json.dumps(payload), history)
-    print(f"Agent Response: {json.dumps(json.loads(result), indent=2)}")
+    print(f"Agent Response: {json.dumps(result, indent=2)}")
     
     print("\n" + "=" * 70)
     print("TESTS COMPLETE")